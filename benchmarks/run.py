@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+"""Time pipy on synthetic panel data and save the results as JSON.
+
+python benchmarks/run.py --output results.json
+python benchmarks/run.py --quick --compare results.json
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+from pipy import pipeline
+from pipy.tests import testing
+
+
+class Frame(pipeline.extract.Extract):
+    _params = {"df": None}
+
+    def extract(self, df: pd.DataFrame = pd.DataFrame()):
+        return self.params["df"]
+
+    def get_columns_out(self):
+        return self.params["df"].columns.tolist()
+
+
+def get_feature_pipeline(df, n_steps=1, cls=pipeline.Pipeline):
+    notionals = [c for c in df.columns if "notional" in c]
+    steps = [Frame(params={"df": df})]
+    steps.append(pipeline.transform.DayOfWeek(columns={"in": "date"}))
+    for n in range(n_steps):
+        steps.append(
+            pipeline.transform.MovingAverage(
+                columns={"in": notionals, "by": ["firm_id"]},
+                params={"periods": [2 + n, 5 + n]},
+            )
+        )
+    steps.append(pipeline.transform.Normalise(columns={"in": notionals}))
+    steps.append(
+        pipeline.model.SkLearnModelWrapper(
+            columns={"target": notionals[0], "features": notionals[1:]},
+            params={"sklearn_model": LinearRegression()},
+        )
+    )
+    return cls({"steps": steps})
+
+
+def timeit(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def bench_run(sizes, repeat):
+    for n_firms, n_dates, n_columns, n_steps in sizes:
+        df = testing.get_panel_dataset(n_firms, n_dates, n_columns)
+        pipe = get_feature_pipeline(df, n_steps)
+        params = dict(rows=len(df), columns=n_columns, steps=n_steps)
+        yield "pipeline_run", params, timeit(pipe.run, repeat)
+
+
+def bench_skippy(sizes, repeat):
+    for n_firms, n_dates, n_columns, n_steps in sizes:
+        df = testing.get_panel_dataset(n_firms, n_dates, n_columns)
+        params = dict(rows=len(df), columns=n_columns, steps=n_steps)
+        pipe = get_feature_pipeline(df, n_steps, pipeline.Skippy)
+        pipe.params["append"] = True
+        pipe.run()
+        yield "skippy_unchanged", params, timeit(pipe.run, repeat)
+
+        def change_column():
+            pipe.df["added_notional"] += 1
+            pipe.run()
+
+        yield "skippy_changed_column", params, timeit(change_column, repeat)
+
+        def append_rows():
+            new = testing.get_panel_dataset(n_firms, 1, n_columns, seed=1)
+            new.index += len(pipe.df)
+            pipe.df = pd.concat([pipe.df, new])
+            pipe.run()
+
+        yield "skippy_appended_rows", params, timeit(append_rows, repeat)
+
+
+def bench_moving_average(sizes, repeat):
+    for n_firms, n_dates, n_columns, n_periods in sizes:
+        df = testing.get_panel_dataset(n_firms, n_dates, n_columns)
+        mav = pipeline.transform.MovingAverage(
+            columns={"in": [c for c in df.columns if "notional" in c]},
+            params={"periods": list(range(2, 2 + n_periods))},
+        )
+        params = dict(rows=len(df), columns=n_columns, periods=n_periods)
+        yield "moving_average_sweep", params, timeit(lambda: mav.transform(df), repeat)
+
+
+def bench_model(sizes, repeat):
+    for n_firms, n_dates, n_columns, _ in sizes:
+        df = testing.get_panel_dataset(n_firms, n_dates, n_columns)
+        notionals = [c for c in df.columns if "notional" in c]
+        ols = pipeline.model.SkLearnModelWrapper(
+            columns={"target": notionals[0], "features": notionals[1:]},
+            params={"sklearn_model": LinearRegression()},
+        )
+        params = dict(rows=len(df), columns=n_columns)
+        yield "sklearn_fit", params, timeit(lambda: ols.fit(df), repeat)
+
+
+BENCHMARKS = {
+    "run": bench_run,
+    "skippy": bench_skippy,
+    "moving_average": bench_moving_average,
+    "model": bench_model,
+}
+
+# (n_firms, n_dates, n_columns, n_steps or n_periods)
+SIZES = {
+    "quick": [(10, 100, 2, 1), (10, 100, 8, 4)],
+    "full": [
+        (100, 1000, 2, 1),
+        (1000, 1000, 2, 1),
+        (1000, 1000, 8, 1),
+        (1000, 1000, 2, 10),
+        (10000, 1000, 2, 1),
+        (1000, 1000, 2, 100),
+    ],
+}
+
+
+def get_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, path):
+    with open(path) as f:
+        baseline = json.load(f)
+    key = lambda r: (r["benchmark"], json.dumps(r["params"], sort_keys=True))
+    before = {key(r): r["seconds"] for r in baseline["results"]}
+    for r in results["results"]:
+        if key(r) in before:
+            print(
+                "{:<24} {:<56} {:>8.2f}x".format(
+                    r["benchmark"], str(r["params"]), r["seconds"] / before[key(r)]
+                )
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("benchmarks", nargs="*", default=list(BENCHMARKS))
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument(
+        "--size",
+        action="append",
+        help="n_firms,n_dates,n_columns,n_steps; overrides the default sizes",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--compare", help="earlier results to compare against")
+    args = parser.parse_args(argv)
+
+    sizes = SIZES["quick" if args.quick else "full"]
+    if args.size:
+        sizes = [tuple(int(n) for n in size.split(",")) for size in args.size]
+    results = {
+        "revision": get_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "results": [],
+    }
+    for name in args.benchmarks:
+        for benchmark, params, seconds in BENCHMARKS[name](sizes, args.repeat):
+            print("{:<24} {:<56} {:>8.4f}s".format(benchmark, str(params), seconds))
+            results["results"].append(
+                {"benchmark": benchmark, "params": params, "seconds": seconds}
+            )
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,2 +1,15 @@
-from pipy import parameters, pipeline, widgets
-from pipy.tests import testing
+import importlib
+
+from pipy import parameters, pipeline
+
+_LAZY_MODULES = {
+    "interactive": "pipy.interactive",
+    "testing": "pipy.tests.testing",
+    "widgets": "pipy.widgets",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_MODULES:
+        return importlib.import_module(_LAZY_MODULES[name])
+    raise AttributeError("module 'pipy' has no attribute '{}'".format(name))
@@ -0,0 +1,5 @@
+import sys
+
+from pipy.cli import main
+
+sys.exit(main())
@@ -0,0 +1,46 @@
+import argparse
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def _warm_up():
+    import pipy.pipeline  # noqa: F401
+
+
+def run_spec(path: str, chunksize: int = None) -> dict:
+    from pipy.pipeline.spec import load_spec
+
+    start = time.perf_counter()
+    try:
+        df = load_spec(path).run(chunksize=chunksize)
+    except Exception:
+        return {"path": path, "error": traceback.format_exc()}
+    shape = None if df is None else df.shape
+    return {"path": path, "shape": shape, "seconds": time.perf_counter() - start}
+
+
+def run(args) -> int:
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=_warm_up) as executor:
+        futures = [executor.submit(run_spec, p, args.chunksize) for p in args.specs]
+        for future in as_completed(futures):
+            result = future.result()
+            if "error" in result:
+                failed += 1
+                print("FAILED {}\n{}".format(result["path"], result["error"]))
+            else:
+                print("OK     {path} {shape} {seconds:.3f}s".format(**result))
+    return 1 if failed else 0
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog="pipy")
+    commands = parser.add_subparsers(dest="command", required=True)
+    parser_run = commands.add_parser("run", help="run pipeline specs (JSON or YAML)")
+    parser_run.add_argument("specs", nargs="+")
+    parser_run.add_argument("-j", "--jobs", type=int, default=None)
+    parser_run.add_argument("--chunksize", type=int, default=None)
+    parser_run.set_defaults(func=run)
+    args = parser.parse_args(argv)
+    return args.func(args)
@@ -1,17 +1,70 @@
 import datetime
 import uuid
+import weakref
+from collections import OrderedDict
 
 import ipywidgets as ipy
 from IPython.display import display
 from functools import partial
 from traitlets import HasTraits, Any, Bool, Dict, List, Int, Unicode, validate
 
-from pipy.parameters import Iterable, MultiSelect, Option
+from pipy.parameters import Iterable, MultiSelect, Option, PandasParam
 from pipy.widgets import FilterAndSelect
 
 
-interactive_widget_registry = {}
-widget_registry = {}
+def close_widget(widget):
+    """Close `widget` and everything inside it, releasing their comms."""
+    for child in getattr(widget, "children", ()):
+        close_widget(child)
+    for trait in ("layout", "style"):
+        child = getattr(widget, trait, None)
+        if isinstance(child, ipy.Widget):
+            child.close()
+    widget.close()
+
+
+class WidgetRegistry:
+    """Widgets by the uuid of the traitlet that rendered them.
+
+    Holds at most `maxsize` widgets and closes the least recently used ones
+    beyond that. Entries are also closed and dropped when they are replaced,
+    and when their traitlet is garbage collected.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._widgets = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._widgets
+
+    def __len__(self):
+        return len(self._widgets)
+
+    def get(self, key, default=None):
+        if key not in self._widgets:
+            return default
+        self._widgets.move_to_end(key)
+        return self._widgets[key]
+
+    def __setitem__(self, key, widget):
+        old = self._widgets.pop(key, None)
+        if old is not None and old is not widget:
+            close_widget(old)
+        self._widgets[key] = widget
+        while len(self._widgets) > self.maxsize:
+            _, evicted = self._widgets.popitem(last=False)
+            close_widget(evicted)
+
+    def pop(self, key):
+        widget = self._widgets.pop(key, None)
+        if widget is not None:
+            close_widget(widget)
+        return widget
+
+
+interactive_widget_registry = weakref.WeakValueDictionary()
+widget_registry = WidgetRegistry()
 debugger = ipy.Output()
 
 
@@ -26,11 +79,13 @@ class InteractiveTraitlet(HasTraits):
         self.uuid = str(uuid.uuid4())
         self.obj = obj
         interactive_widget_registry[self.uuid] = self
+        weakref.finalize(self, widget_registry.pop, self.uuid)
         super(InteractiveTraitlet, self).__init__(*args, **kwargs)
 
     @property
     def widget(self):
-        return widget_registry.get(self.uuid, self.render())
+        widget = widget_registry.get(self.uuid)
+        return self.render() if widget is None else widget
 
     def refresh(self):
         self.render()
@@ -106,7 +161,7 @@ class _MultiSelect(InteractiveTraitlet):
 
     def _render(self):
         widget = FilterAndSelect(value=self.obj.value, options=self.obj.options)
-        widget.selected.observe(self._update, names=["options"])
+        widget.observe(self._update, names=["selection"])
         return widget
 
     def _update(self, change):
@@ -133,22 +188,25 @@ class _Iterable(InteractiveTraitlet):
     obj = Any()
 
     def _render(self):
-        widget = ipy.Text(value=str(self.obj.value))
-        # widget.observe(self._update, names=['value'])
-        return widget
+        return ipy.Text(value=", ".join(str(v) for v in self.obj.value))
 
     def _update(self, change):
         if isinstance(change["new"], Iterable):
             return
-        if change["new"] not in self.obj.options:
-            raise ValueError("Value must be on of {}.".format(self.obj.options))
-        self.obj.value = change["new"]
+        items = change["new"].strip().strip("[]()").replace(",", " ").split()
+        try:
+            value = [self.obj.dtype(v) for v in items]
+        except ValueError:
+            raise ValueError(
+                "Values must be a comma separated list of {}.".format(
+                    self.obj.dtype.__name__
+                )
+            )
+        self.obj.value = value
 
 
 class InteractiveDict(InteractiveTraitlet):
     obj = Dict()
-    _registry = {}
-    _iregistry = {}
     _renderers = {
         MultiSelect: _MultiSelect,
         Option: _Option,
@@ -161,13 +219,21 @@ class InteractiveDict(InteractiveTraitlet):
     }
     _key_renderer = _get_label
 
-    def _update(self, change, key):
-        self._iregistry[key]._update(change)
-        self.obj[key] = change["new"]
+    def __init__(self, obj, *args, on_change=None, **kwargs):
+        self.on_change = on_change
+        self.renderers = {}
+        super(InteractiveDict, self).__init__(obj, *args, **kwargs)
+
+    def _update(self, change, key, renderer):
+        renderer._update(change)
+        # Params are updated in place by their renderer.
+        if not isinstance(self.obj[key], PandasParam):
+            self.obj[key] = change["new"]
+        if self.on_change is not None:
+            self.on_change(key)
 
     def _get_widgets(self):
         for key, value in self.obj.items():
-            label = self._key_renderer(key)
             renderer_cls = self._renderers.get(type(value), value)
 
             try:
@@ -175,18 +241,25 @@ class InteractiveDict(InteractiveTraitlet):
             except TypeError:
                 pass
             else:
-                self._iregistry[key] = renderer
+                self.renderers[key] = renderer
                 widget = renderer.render()
-                widget.observe(partial(self._update, key=key), names=["value"])
-                self._registry[key] = widget
+                widget.observe(
+                    partial(self._update, key=key, renderer=renderer),
+                    names=["value", "selection"],
+                )
+                label = self._key_renderer(key)
                 yield renderer_cls.label_position([label, widget])
 
     def _render(self):
-        widgets = tuple(self._get_widgets())
-        if self.uuid in self._registry:
-            widget = self._registry[self.uuid]
-            widget.children = widgets
+        widget = widget_registry.get(self.uuid)
+        if widget is None:
+            widget = ipy.VBox()
         else:
-            widget = ipy.VBox(widgets)
-            self._registry[self.uuid] = widget
+            # The box is reused but its widgets are rebuilt, so close the old ones.
+            for child in widget.children:
+                close_widget(child)
+            for renderer in self.renderers.values():
+                widget_registry.pop(renderer.uuid)
+            self.renderers = {}
+        widget.children = tuple(self._get_widgets())
         return widget
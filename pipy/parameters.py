@@ -7,6 +7,10 @@ class PandasParam:
     def value(self):
         return self._value() if callable(self._value) else self._value
 
+    @value.setter
+    def value(self, value):
+        self._value = value
+
     def __repr__(self):
         return str("{}({}, {})".format(type(self).__name__, self.value, self.options))
 
@@ -0,0 +1,119 @@
+import weakref
+from functools import partial
+
+import graphviz
+import ipywidgets as ipy
+from IPython.display import display
+
+from pipy.columns import All
+from pipy.interactive import InteractiveDict, close_widget
+
+# The containers of each step and pipeline are reused when displayed again; the
+# input widgets inside them are rebuilt on every render and the old ones closed.
+_step_widgets = weakref.WeakKeyDictionary()
+_pipeline_widgets = weakref.WeakKeyDictionary()
+
+
+def get_label(s):
+    return ipy.HTML("<b>{}</b>".format(s))
+
+
+def _close_widgets(widgets):
+    for widget in widgets:
+        close_widget(widget)
+
+
+def _get_step_widgets(step):
+    if step not in _step_widgets:
+        sections = []
+        for title, obj in (("Columns:", step.columns), ("Parameters:", step.params)):
+            interactive = InteractiveDict(obj)
+            hspace = ipy.Box([], layout=ipy.Layout(min_width="20px"))
+            box = ipy.HBox([hspace, interactive.render()])
+            sections.append((interactive, get_label(title), box))
+        widget = ipy.VBox()
+        _step_widgets[step] = (sections, widget)
+        widgets = [widget] + [w for _, label, box in sections for w in (label, box)]
+        weakref.finalize(step, _close_widgets, widgets)
+    return _step_widgets[step]
+
+
+def render_step(step, on_change=None):
+    sections, widget = _get_step_widgets(step)
+    widgets = []
+    for interactive, label, box in sections:
+        interactive.on_change = on_change
+        if interactive.render().children:
+            widgets += [label, box]
+    widget.children = widgets
+    return widget
+
+
+def display_step(step):
+    display(step.render())
+
+
+def display_dag(pipeline):
+    dag = graphviz.Digraph(
+        graph_attr={"fixedsize": "false", "outputorder": "edgesfirst"},
+        node_attr={
+            "height": "0.4",
+            "fontsize": "11",
+            "style": "filled",
+            "color": "white",
+        },
+        edge_attr={"arrowsize": "0.6"},
+    )
+    times = pipeline.profiler.get_step_times()
+    for step in pipeline.params["steps"]:
+        columns_in = step.get_columns_in()
+        columns_out = step.get_columns_out()
+        if step.uuid in times:
+            # Shade steps from white to red by their share of the slowest step.
+            heat = times[step.uuid] / max(times.max(), 1e-9)
+            label = "{}\n{:.3f}s".format(step.name, times[step.uuid])
+            color = "0.000 {:.3f} 1.000".format(0.1 + 0.8 * heat)
+            dag.node(step.name, label=label, shape="box", color=color)
+        else:
+            dag.node(step.name, shape="box", color="lightblue")
+        with dag.subgraph() as s:
+            for c in columns_out:
+                s.attr(rank="same")
+                s.node(c, shape="box", height="0.2")
+        if not isinstance(columns_in, All):
+            dag.edges([(c, step.name) for c in columns_in])
+        dag.edges([(step.name, c) for c in columns_out])
+    display(dag)
+
+
+def _notify(pipeline, step, key):
+    # Weak references, so that cached widgets do not keep their step alive.
+    pipeline, step = pipeline(), step()
+    if pipeline is not None and step is not None:
+        pipeline.notify(step)
+
+
+def display_pipeline(pipeline):
+    steps = [
+        render_step(
+            s, on_change=partial(_notify, weakref.ref(pipeline), weakref.ref(s))
+        )
+        for s in pipeline.params["steps"]
+    ]
+    for old in _pipeline_widgets.pop(pipeline, ()):
+        old.layout.close()
+        old.close()
+    widget = ipy.Accordion(steps)
+    widget.selected_index = None
+    for n, s in enumerate(pipeline.params["steps"]):
+        widget.set_title(n, s.name)
+
+    output = ipy.Output(layout=ipy.Layout(overflow="auto", _webkit_overflow_y="auto"))
+    with output:
+        display_dag(pipeline)
+
+    tabs = ipy.Tab([widget, output])
+    tabs.set_title(0, "Steps")
+    tabs.set_title(1, "Blueprint")
+    _pipeline_widgets[pipeline] = (widget, output, tabs)
+    display(tabs)
@@ -0,0 +1,164 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from joblib import hash as hashy
+
+from pipy.columns import All
+from pipy.parameters import PandasParam
+from pipy.pipeline.fingerprint import fingerprint
+from pipy.pipeline.state import _load_value, _save_value
+
+
+def _freeze(value):
+    if isinstance(value, PandasParam):
+        return [type(value).__name__, _freeze(value.value)]
+    if isinstance(value, dict):
+        return sorted((str(k), _freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return [_freeze(v) for v in value]
+    if hasattr(value, "get_params"):
+        return [type(value).__name__, _freeze(value.get_params(deep=False))]
+    return value
+
+
+class StepCache:
+    """Size-bounded on-disk cache of step output columns.
+
+    Entries are keyed by the step class, its params and the hashes of its input
+    columns, stored as one .npy file per column and evicted least recently used
+    first once the cache grows beyond `max_bytes`. A hit skips both `fit` and
+    `transform`; the coeffs the step had after them are stored with the entry
+    and restored by `get_coeffs`.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 2**30):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+
+    def get_params(self, deep=True):
+        return {"path": self.path, "max_bytes": self.max_bytes}
+
+    def get_key(self, step, df):
+        columns_in = step.get_columns_in()
+        columns_out = step.get_columns_out()
+        if isinstance(columns_in, All) or not columns_in or not columns_out:
+            return None
+        return hashy(
+            {
+                "step": "{}.{}".format(type(step).__module__, type(step).__name__),
+                "params": _freeze(step.params),
+                "columns_in": list(columns_in),
+                "columns_out": list(columns_out),
+                "hashes": [fingerprint(df[c]) for c in columns_in],
+            }
+        )
+
+    def _entry(self, key):
+        return os.path.join(self.path, key)
+
+    def get(self, key):
+        entry = self._entry(key)
+        try:
+            with open(os.path.join(entry, "manifest.json")) as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        os.utime(os.path.join(entry, "manifest.json"))
+
+        def load(name, pickled):
+            if pickled:
+                return np.load(os.path.join(entry, name), allow_pickle=True)
+            return np.load(os.path.join(entry, name), mmap_mode="r")
+
+        index = manifest["index"]
+        if "start" in index:
+            index = pd.RangeIndex(index["start"], index["stop"], index["step"])
+        else:
+            index = pd.Index(load("index.npy", index["pickled"]), name=index["name"])
+        columns = {}
+        for n, (column, dtype, pickled) in enumerate(manifest["columns"]):
+            values = load("{}.npy".format(n), pickled)
+            s = pd.Series(values, index=index, name=column)
+            columns[column] = s if str(s.dtype) == dtype else s.astype(dtype)
+        return pd.DataFrame(columns, index=index)
+
+    def get_coeffs(self, key):
+        entry = self._entry(key)
+        try:
+            with open(os.path.join(entry, "manifest.json")) as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if "coeffs" not in manifest:
+            return None
+        return {k: _load_value(entry, v, True) for k, v in manifest["coeffs"].items()}
+
+    def put(self, key, df: pd.DataFrame, coeffs: dict = None):
+        tmp = tempfile.mkdtemp(dir=self.path, prefix=".tmp-")
+        if isinstance(df.index, pd.RangeIndex):
+            index = {
+                "start": df.index.start,
+                "stop": df.index.stop,
+                "step": df.index.step,
+            }
+        else:
+            values = np.asarray(df.index)
+            index = {"name": df.index.name, "pickled": values.dtype.hasobject}
+            np.save(os.path.join(tmp, "index.npy"), values)
+        columns = []
+        for n, (column, s) in enumerate(df.items()):
+            values = s.to_numpy()
+            np.save(os.path.join(tmp, "{}.npy".format(n)), values)
+            columns.append((column, str(s.dtype), values.dtype.hasobject))
+        manifest = {
+            "index": index,
+            "columns": columns,
+            "coeffs": {
+                k: _save_value(tmp, "coeffs-{}".format(n), v)
+                for n, (k, v) in enumerate((coeffs or {}).items())
+            },
+        }
+        try:
+            manifest = json.dumps(manifest)
+        except TypeError:
+            # Coeffs that cannot be stored could not be restored on a hit.
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        with open(os.path.join(tmp, "manifest.json"), "w") as f:
+            f.write(manifest)
+        try:
+            os.replace(tmp, self._entry(key))
+        except OSError:
+            # Another writer got there first with the same content.
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def _get_entries(self):
+        for name in os.listdir(self.path):
+            entry = self._entry(name)
+            if name.startswith(".") or not os.path.isdir(entry):
+                continue
+            try:
+                atime = os.path.getmtime(os.path.join(entry, "manifest.json"))
+                size = sum(e.stat().st_size for e in os.scandir(entry))
+            except FileNotFoundError:
+                continue
+            yield atime, size, entry
+
+    def evict(self):
+        entries = sorted(self._get_entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        for _, _, entry in self._get_entries():
+            shutil.rmtree(entry, ignore_errors=True)
@@ -0,0 +1,111 @@
+import networkx as nx
+
+from pipy.parameters import PandasParam
+
+
+def _freeze(value):
+    if isinstance(value, PandasParam):
+        # Not `value.value`, which would call e.g. the `get_columns_out` of
+        # another step; the params of that step stand in for its result.
+        value = value._value
+    owner = getattr(value, "__self__", None)
+    if hasattr(owner, "uuid") and hasattr(owner, "params"):
+        return value.__name__, _get_signature(owner)
+    if hasattr(value, "uuid") and hasattr(value, "params"):
+        return _get_signature(value)
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if hasattr(value, "get_params"):
+        return type(value).__name__, _freeze(value.get_params(deep=False))
+    return value
+
+
+def _get_signature(step):
+    return (
+        step.uuid,
+        _freeze(getattr(step, "params", {})),
+        _freeze(getattr(step, "columns", {})),
+    )
+
+
+def _iter_bits(bits: int):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class DagIndex:
+    """Column DAG of a list of steps, indexed for dependency lookups.
+
+    Each node gets a position in a topological order and bitsets, as ints, of
+    its ancestors and descendants, so a lookup costs time in the number of
+    nodes it returns. `refresh` only calls `get_dag` again for steps whose params
+    or columns were edited since the last refresh, without asking any step for
+    its columns.
+    """
+
+    def __init__(self):
+        self.graph = nx.DiGraph()
+        self.order = []
+        self.positions = {}
+        self.ancestors = []
+        self.descendants = []
+        self._steps = {}
+
+    def refresh(self, steps: list) -> bool:
+        changed = False
+        uuids = set()
+        for step in steps:
+            uuids.add(step.uuid)
+            signature = _get_signature(step)
+            cached = self._steps.get(step.uuid)
+            if cached is not None and cached[0] == signature:
+                continue
+            self._steps[step.uuid] = (signature, step.get_columns_out(), step.get_dag())
+            changed = True
+        for uuid in set(self._steps).difference(uuids):
+            del self._steps[uuid]
+            changed = True
+        if changed:
+            graph = nx.DiGraph()
+            for _, _, dag in self._steps.values():
+                graph.update(dag)
+            self._index(graph)
+        return changed
+
+    def get_outputs(self, step) -> list:
+        """Output columns of `step` as of the last refresh."""
+        cached = self._steps.get(step.uuid)
+        return [] if cached is None else list(cached[1])
+
+    def _index(self, graph: nx.DiGraph):
+        self.graph = graph
+        self.order = list(nx.topological_sort(graph))
+        self.positions = {node: n for n, node in enumerate(self.order)}
+        self.ancestors = [0] * len(self.order)
+        self.descendants = [0] * len(self.order)
+        for n, node in enumerate(self.order):
+            for parent in graph.predecessors(node):
+                m = self.positions[parent]
+                self.ancestors[n] |= self.ancestors[m] | (1 << m)
+        for n in reversed(range(len(self.order))):
+            for child in graph.successors(self.order[n]):
+                m = self.positions[child]
+                self.descendants[n] |= self.descendants[m] | (1 << m)
+
+    def _lookup(self, bitsets, nodes):
+        bits = 0
+        for node in nodes:
+            if node in self.positions:
+                bits |= bitsets[self.positions[node]]
+        return [self.order[n] for n in _iter_bits(bits)]
+
+    def get_ancestors(self, nodes) -> list:
+        return self._lookup(self.ancestors, nodes)
+
+    def get_descendants(self, nodes) -> list:
+        """Nodes downstream of any of `nodes`, once each, in topological order."""
+        return self._lookup(self.descendants, nodes)
@@ -1,35 +1,77 @@
+import queue
+import threading
+import uuid
+from contextlib import contextmanager
 from textwrap import dedent
 
+import numpy as np
 import pandas as pd
 
 try:
-    from psycopg2.extensions import connection
+    import psycopg2
 except:
     PSYCOPG2_NOT_AVAILABLE = True
 else:
     PSYCOPG2_NOT_AVAILABLE = False
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    PYARROW_NOT_AVAILABLE = True
+else:
+    PYARROW_NOT_AVAILABLE = False
+
 from pipy.pipeline import Step
 
 
 class Extract(Step):
+    usecols = None
+
     def get_columns_in(self):
         return []
 
+    def _select(self, df):
+        if self.usecols is None or not isinstance(df, pd.DataFrame):
+            return df
+        unused = set(self.get_columns_out()).difference(self.usecols)
+        return df.drop(columns=[c for c in df.columns if c in unused])
+
     def extract(self, df: pd.DataFrame = pd.DataFrame()):
         return df
 
+    def extract_chunks(self, df: pd.DataFrame = pd.DataFrame(), chunksize: int = None):
+        yield self.extract(df)
+
     def transform(self, df: pd.DataFrame = pd.DataFrame()):
-        return self.extract(df)
+        return self._select(self.extract(df))
+
+    def stream(self, chunks, chunksize: int = None):
+        for df in chunks:
+            for df_ in self.extract_chunks(df, chunksize):
+                yield self._select(df_)
 
 
 class CSV(Extract):
     _params = {"path": "", "pandas_kwargs": {}}
 
-    def extract(self, df: pd.DataFrame = pd.DataFrame()):
+    def _get_options(self):
         options = {"header": 0}
         options.update(self.params["pandas_kwargs"])
-        return pd.read_csv(self.params["path"], **options)
+        if self.usecols is not None:
+            options.update(usecols=self.usecols)
+        return options
+
+    def extract(self, df: pd.DataFrame = pd.DataFrame()):
+        return pd.read_csv(self.params["path"], **self._get_options())
+
+    def extract_chunks(self, df: pd.DataFrame = pd.DataFrame(), chunksize: int = None):
+        if chunksize is None:
+            yield self.extract(df)
+            return
+        options = self._get_options()
+        with pd.read_csv(self.params["path"], chunksize=chunksize, **options) as reader:
+            yield from reader
 
     def get_columns_out(self):
         options = {"header": 0}
@@ -38,6 +80,178 @@ class CSV(Extract):
         return pd.read_csv(self.params["path"], **options).columns.tolist()
 
 
+def _get_names(schema):
+    metadata = schema.pandas_metadata or {}
+    index = [c for c in metadata.get("index_columns", []) if isinstance(c, str)]
+    return [name for name in schema.names if name not in index]
+
+
+def _to_pandas(table):
+    # split_blocks keeps null-free numeric columns as views on the Arrow buffers.
+    return table.to_pandas(split_blocks=True)
+
+
+def _iter_chunks(batches):
+    start = 0
+    for batch in batches:
+        df = _to_pandas(pa.Table.from_batches([batch]))
+        if isinstance(df.index, pd.RangeIndex) and df.index.start == 0:
+            df.index = pd.RangeIndex(start, start + len(df))
+        start += len(df)
+        yield df
+
+
+class Feather(Extract):
+    """Read an Arrow IPC (Feather V2) file through a memory map.
+
+    Uncompressed files are not copied on read: columns are handed to pandas as
+    views on the mapped file wherever the dtypes allow it.
+    """
+
+    _params = {"path": ""}
+
+    def _read(self):
+        return pa.ipc.open_file(pa.memory_map(self.params["path"]))
+
+    def extract(self, df: pd.DataFrame = pd.DataFrame()):
+        table = self._read().read_all()
+        if self.usecols is not None:
+            table = table.select(list(self.usecols))
+        return _to_pandas(table)
+
+    def extract_chunks(self, df: pd.DataFrame = pd.DataFrame(), chunksize: int = None):
+        if chunksize is None:
+            yield self.extract(df)
+            return
+        table = self._read().read_all()
+        if self.usecols is not None:
+            table = table.select(list(self.usecols))
+        yield from _iter_chunks(table.to_batches(max_chunksize=chunksize))
+
+    def get_columns_out(self):
+        return _get_names(self._read().schema)
+
+
+class Parquet(Extract):
+    _params = {"path": ""}
+
+    def _get_columns(self):
+        return None if self.usecols is None else list(self.usecols)
+
+    def extract(self, df: pd.DataFrame = pd.DataFrame()):
+        table = pq.read_table(
+            self.params["path"], columns=self._get_columns(), memory_map=True
+        )
+        return _to_pandas(table)
+
+    def extract_chunks(self, df: pd.DataFrame = pd.DataFrame(), chunksize: int = None):
+        if chunksize is None:
+            yield self.extract(df)
+            return
+        reader = pq.ParquetFile(self.params["path"], memory_map=True)
+        batches = reader.iter_batches(batch_size=chunksize, columns=self._get_columns())
+        yield from _iter_chunks(batches)
+
+    def get_columns_out(self):
+        return _get_names(pq.read_schema(self.params["path"], memory_map=True))
+
+
+def _connect(dsn):
+    return psycopg2.connect(dsn)
+
+
+class ConnectionPool:
+    def __init__(self, connect, dsn, maxconn: int = 8):
+        self.connect = connect
+        self.dsn = dsn
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(maxconn)
+
+    @contextmanager
+    def connection(self):
+        with self._slots:
+            try:
+                cxn = self._idle.get_nowait()
+            except queue.Empty:
+                cxn = self.connect(self.dsn)
+            try:
+                yield cxn
+                cxn.rollback()
+            except BaseException:
+                # Including GeneratorExit from a consumer that stopped early.
+                cxn.close()
+                raise
+            self._idle.put(cxn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_local = threading.local()
+_schemas = {}
+
+
+def get_pool(connect, dsn, threadsafety: int = 2):
+    """Connection pool for `connect` and `dsn`.
+
+    Drivers with a DB-API `threadsafety` below 2 get one pool per thread, as
+    their connections cannot move between threads.
+    """
+    if threadsafety < 2:
+        pools = _local.__dict__.setdefault("pools", {})
+        if (connect, dsn) not in pools:
+            pools[connect, dsn] = ConnectionPool(connect, dsn)
+        return pools[connect, dsn]
+    with _pools_lock:
+        if (connect, dsn) not in _pools:
+            _pools[connect, dsn] = ConnectionPool(connect, dsn)
+        return _pools[connect, dsn]
+
+
+def close_pools():
+    """Close the shared pools and those of the calling thread.
+
+    Pools of other threads go when their thread does.
+    """
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+    for pool in _local.__dict__.pop("pools", {}).values():
+        pool.close()
+
+
+def _convert(values: np.ndarray) -> np.ndarray:
+    # Decimals become floats, as with the coerce_float of pd.read_sql.
+    if pd.api.types.infer_dtype(values, skipna=True) == "decimal":
+        return pd.to_numeric(values)
+    return pd.Series(values, copy=False).infer_objects().to_numpy()
+
+
+def _promote(a: np.ndarray, values: np.ndarray) -> np.ndarray:
+    if values.dtype == a.dtype:
+        return a
+    if a.dtype.kind in "biuf" and values.dtype.kind in "biuf":
+        return a.astype(np.promote_types(a.dtype, values.dtype))
+    return a.astype(object)
+
+
+def _fetch(cursor, batchsize):
+    while True:
+        rows = cursor.fetchmany(batchsize)
+        if not rows:
+            return
+        yield [
+            _convert(np.fromiter(v, dtype=object, count=len(rows))) for v in zip(*rows)
+        ]
+
+
 class SQL(Extract):
     _params = {
         "dsn": "",
@@ -48,15 +262,95 @@ class SQL(Extract):
             LIMIT 10
             """
         ),
+        "batchsize": 10000,
     }
+    connect = staticmethod(_connect)
+    # DB-API threadsafety of the driver behind `connect`; psycopg2's is 2.
+    threadsafety = 2
+
+    def _get_query(self):
+        return self.params["query"].strip().rstrip(";")
+
+    def _get_select_query(self):
+        if self.usecols is None:
+            return self._get_query()
+        columns = ", ".join('"{}"'.format(c.replace('"', '""')) for c in self.usecols)
+        return "SELECT {} FROM ({}) AS q".format(columns, self._get_query())
+
+    def _get_cursor(self, cxn):
+        if not PSYCOPG2_NOT_AVAILABLE and isinstance(
+            cxn, psycopg2.extensions.connection
+        ):
+            cursor = cxn.cursor(name="pipy_{}".format(uuid.uuid4().hex))
+            cursor.itersize = self.params["batchsize"]
+            return cursor
+        return cxn.cursor()
+
+    def _iter_batches(self, batchsize):
+        pool = get_pool(self.connect, self.params["dsn"], self.threadsafety)
+        with pool.connection() as cxn:
+            cursor = self._get_cursor(cxn)
+            try:
+                cursor.execute(self._get_select_query(), self.params["params"])
+                batches = _fetch(cursor, batchsize)
+                first = next(batches, None)
+                # Server-side cursors only describe the result after a fetch.
+                yield [d[0] for d in cursor.description]
+                if first is not None:
+                    yield first
+                    yield from batches
+            finally:
+                cursor.close()
 
     def extract(self, df: pd.DataFrame = pd.DataFrame()):
-        with connection(self.params["dsn"]) as cxn:
-            _df = pd.read_sql(self.params["query"], cxn, params=self.params["params"])
-            return pd.concat([df, _df], axis=1)
+        batchsize = self.params["batchsize"]
+        batches = self._iter_batches(batchsize)
+        columns = next(batches)
+        arrays = [np.empty(0, dtype=object) for _ in columns]
+        n = 0
+        for batch in batches:
+            if not n:
+                # Typed like the first batch, and widened if later ones need it.
+                arrays = [np.empty(batchsize, dtype=v.dtype) for v in batch]
+            m = n + len(batch[0])
+            if m > len(arrays[0]):
+                size = max(m, 2 * len(arrays[0]))
+                arrays = [np.resize(a, size) for a in arrays]
+            arrays = [_promote(a, values) for a, values in zip(arrays, batch)]
+            for a, values in zip(arrays, batch):
+                a[n:m] = values
+            n = m
+        return pd.DataFrame(dict(zip(columns, (a[:n] for a in arrays))))
+
+    def extract_chunks(self, df: pd.DataFrame = pd.DataFrame(), chunksize: int = None):
+        if chunksize is None:
+            yield self.extract(df)
+            return
+        batches = self._iter_batches(chunksize)
+        columns = next(batches)
+        n = 0
+        for batch in batches:
+            index = pd.RangeIndex(n, n + len(batch[0]))
+            n = index.stop
+            yield pd.DataFrame(dict(zip(columns, batch)), index=index)
 
     def get_columns_out(self):
-        with connection(self.params["dsn"]) as cxn:
-            return pd.read_sql(
-                self.params["query"] + " LIMIT 0", cxn, params=self.params["params"]
-            ).columns.tolist()
+        key = (
+            self.connect,
+            self.params["dsn"],
+            self._get_query(),
+            repr(self.params["params"]),
+        )
+        if key not in _schemas:
+            pool = get_pool(self.connect, self.params["dsn"], self.threadsafety)
+            with pool.connection() as cxn:
+                cursor = cxn.cursor()
+                try:
+                    cursor.execute(
+                        "SELECT * FROM ({}) AS q LIMIT 0".format(self._get_query()),
+                        self.params["params"],
+                    )
+                    _schemas[key] = [d[0] for d in cursor.description]
+                finally:
+                    cursor.close()
+        return list(_schemas[key])
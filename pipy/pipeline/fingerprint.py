@@ -0,0 +1,74 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    import xxhash
+except ImportError:
+    XXHASH_NOT_AVAILABLE = True
+else:
+    XXHASH_NOT_AVAILABLE = False
+
+
+def _new_hash():
+    if XXHASH_NOT_AVAILABLE:
+        return hashlib.blake2b(digest_size=16)
+    return xxhash.xxh3_128()
+
+
+def _get_buffer(values) -> np.ndarray:
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return np.ascontiguousarray(values.codes)
+    array = np.asarray(values)
+    if array.dtype.hasobject:
+        # Stable across processes, unlike pickles of the objects themselves.
+        return pd.util.hash_array(array, categorize=False)
+    return np.ascontiguousarray(array)
+
+
+def _update_index(h, index: pd.Index):
+    if isinstance(index, pd.RangeIndex):
+        h.update("{}:{}:{}".format(index.start, index.stop, index.step).encode())
+    else:
+        h.update(fingerprint(index).encode())
+
+
+def fingerprint(values) -> str:
+    """Hex digest of the dtype and values of a Series, Index or array.
+
+    Numeric and datetime values are hashed straight from their buffers, object
+    values through `pd.util.hash_array` and categoricals as their codes plus
+    their categories. The index of a Series is part of its fingerprint.
+    """
+    h = _new_hash()
+    if isinstance(values, pd.Series):
+        _update_index(h, values.index)
+    if isinstance(values, (pd.Series, pd.Index)):
+        values = values.array
+    h.update(str(values.dtype).encode())
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        h.update(fingerprint(values.categories).encode())
+    h.update(_get_buffer(values).view(np.uint8))
+    return h.hexdigest()
+
+
+def fingerprint_columns(df: pd.DataFrame, n_jobs: int = -1) -> pd.Series:
+    """Fingerprints of every column of `df`, computed on a thread pool.
+
+    Both hash functions release the GIL on large buffers, so columns are hashed
+    in parallel.
+    """
+    columns = list(df.columns)
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = min(n_jobs, len(columns))
+    series = (df.iloc[:, n] for n in range(len(columns)))
+    if n_jobs <= 1:
+        hashes = [fingerprint(s) for s in series]
+    else:
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            hashes = list(executor.map(fingerprint, series))
+    return pd.Series(hashes, index=columns, dtype=object)
@@ -0,0 +1,87 @@
+from collections.abc import Hashable
+
+import pandas as pd
+
+
+class ColumnStore:
+    """Append-only collection of columns sharing one index.
+
+    Steps append their output columns without copying the columns that are
+    already there; a DataFrame is only assembled by `to_frame`.
+    """
+
+    def __init__(self, df: pd.DataFrame = None):
+        self.index = None
+        self._columns = {}
+        self._frame = None
+        if df is not None:
+            self.append(df)
+
+    @property
+    def columns(self):
+        return pd.Index(list(self._columns))
+
+    @property
+    def empty(self):
+        return not self._columns or not len(self)
+
+    @property
+    def shape(self):
+        return len(self), len(self._columns)
+
+    def __len__(self):
+        return 0 if self.index is None else len(self.index)
+
+    def __iter__(self):
+        yield from self._columns
+
+    def __contains__(self, column):
+        return column in self._columns
+
+    def __getitem__(self, key):
+        if isinstance(key, Hashable) and key in self._columns:
+            return self._columns[key]
+        return pd.DataFrame({c: self._columns[c] for c in key}, index=self.index)
+
+    def _append_series(self, s: pd.Series):
+        if not self._columns:
+            self.index = s.index
+        elif not s.index.equals(self.index):
+            # Align rows in another order, but never drop or invent any.
+            if len(s.index) != len(self.index) or not s.index.isin(self.index).all():
+                raise ValueError(
+                    "Column {!r} does not have the index of the frame.".format(s.name)
+                )
+            s = s.reindex(self.index)
+        self._columns[s.name] = s
+
+    def append(self, new):
+        if isinstance(new, pd.Series):
+            self._append_series(new)
+        else:
+            if self.index is None or not self._columns:
+                self.index = new.index
+            for _, s in new.items():
+                self._append_series(s)
+        self._frame = None
+        return self
+
+    def to_frame(self) -> pd.DataFrame:
+        if self._frame is None:
+            if self._columns:
+                self._frame = pd.DataFrame(self._columns, index=self.index)
+            else:
+                self._frame = pd.DataFrame(index=self.index)
+        return self._frame
+
+
+def append_columns(df, new):
+    if isinstance(df, ColumnStore):
+        return df.append(new)
+    return pd.concat([df, new], axis=1)
+
+
+def as_frame(df) -> pd.DataFrame:
+    if isinstance(df, ColumnStore):
+        return df.to_frame()
+    return df
@@ -1,12 +1,79 @@
+import queue
+import threading
+from functools import partial
+
 import pandas as pd
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    PYARROW_NOT_AVAILABLE = True
+else:
+    PYARROW_NOT_AVAILABLE = False
+
 from pipy.columns import All
+from pipy.parameters import MultiSelect
 from pipy.pipeline import Step
+from pipy.pipeline.frame import as_frame
+
+
+class BackgroundWriter:
+    """Run writes in submission order on a single background thread.
+
+    `submit` blocks once `maxsize` writes are waiting. The first error raised by
+    a write is re-raised by the next `submit` or by `close`; writes queued after
+    it are dropped.
+    """
+
+    def __init__(self, maxsize: int = 2):
+        self._queue = queue.Queue(maxsize)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            if self._error is None:
+                try:
+                    task()
+                except BaseException as e:
+                    self._error = e
+
+    def _raise(self):
+        if self._error is not None:
+            raise self._error
+
+    def submit(self, func, *args, **kwargs):
+        self._raise()
+        self._queue.put(partial(func, *args, **kwargs))
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        self._raise()
 
 
 class Load(Step):
+    """Write the selected columns somewhere.
+
+    With the `background` param set, writes are handed to a `BackgroundWriter`
+    so that computing the next chunk overlaps with writing the last one. Pending
+    writes are waited for, and their errors raised, by `close`, which pipelines
+    call at the end of every run.
+    """
+
+    _columns = {"in": MultiSelect([], [])}
+    _params = {"background": False}
+    _sink = True
+    _background = None
+    max_pending = 2
+
     def get_columns_in(self):
-        return All()
+        return self.columns["in"].value or All()
 
     def get_columns_out(self):
         return []
@@ -14,13 +81,118 @@ class Load(Step):
     def load(self, df: pd.DataFrame):
         return df
 
-    def transform(self, df: pd.DataFrame):
+    def load_chunk(self, df: pd.DataFrame, first: bool):
         return self.load(df)
 
+    def _submit(self, func, *args):
+        if not self.params.get("background"):
+            func(*args)
+            return
+        if self._background is None:
+            self._background = BackgroundWriter(self.max_pending)
+        self._background.submit(func, *args)
+
+    def close(self):
+        background, self._background = self._background, None
+        if background is not None:
+            background.close()
+
+    def _select(self, df):
+        columns_in = self.get_columns_in()
+        if isinstance(columns_in, All):
+            return as_frame(df)
+        return df[list(columns_in)]
+
+    def transform(self, df: pd.DataFrame):
+        self._submit(self.load, self._select(df))
+        return df
+
+    def stream(self, chunks, chunksize: int = None):
+        try:
+            for n, df in enumerate(chunks):
+                self._submit(self.load_chunk, self._select(df), n == 0)
+                yield df
+        finally:
+            self.close()
+
 
 class CSV(Load):
-    _params = {"path": "", "pandas_kwargs": {}}
+    _params = {"path": "", "pandas_kwargs": {}, "background": False}
 
     def load(self, df):
-        df.to_csv(self.params["file"], **self.params["pandas_kwargs"])
+        df.to_csv(self.params["path"], **self.params["pandas_kwargs"])
+        return df
+
+    def load_chunk(self, df: pd.DataFrame, first: bool):
+        options = dict(self.params["pandas_kwargs"])
+        if not first:
+            options.update(mode="a", header=False)
+        df.to_csv(self.params["path"], **options)
+        return df
+
+
+class _ArrowLoad(Load):
+    _params = {"path": "", "compression": None, "background": False}
+    _writer = None
+    _schema = None
+
+    def open(self, schema):
+        raise NotImplementedError
+
+    def load_chunk(self, df: pd.DataFrame, first: bool):
+        if first:
+            self._close_writer()
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self._schema = table.schema
+            self._writer = self.open(table.schema)
+        else:
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        self._writer.write_table(table)
+        return df
+
+    def _close_writer(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._close_writer()
+
+
+class Feather(_ArrowLoad):
+    """Write an Arrow IPC (Feather V2) file, optionally compressed ("lz4", "zstd").
+
+    Files written uncompressed can be read back without copying by
+    `extract.Feather`.
+    """
+
+    def _get_options(self):
+        return pa.ipc.IpcWriteOptions(compression=self.params["compression"])
+
+    def open(self, schema):
+        return pa.ipc.new_file(self.params["path"], schema, options=self._get_options())
+
+    def load(self, df: pd.DataFrame):
+        table = pa.Table.from_pandas(df)
+        with self.open(table.schema) as writer:
+            writer.write_table(table)
+        return df
+
+
+class Parquet(_ArrowLoad):
+    _params = {"path": "", "compression": "snappy", "background": False}
+
+    def open(self, schema):
+        return pq.ParquetWriter(
+            self.params["path"], schema, compression=self.params["compression"]
+        )
+
+    def load(self, df: pd.DataFrame):
+        table = pa.Table.from_pandas(df)
+        pq.write_table(
+            table, self.params["path"], compression=self.params["compression"]
+        )
         return df
@@ -1,12 +1,16 @@
+from copy import deepcopy
+
 import numpy as np
 import pandas as pd
 
 from pipy.pipeline import Step
+from pipy.pipeline.frame import append_columns
 from pipy.parameters import Option, MultiSelect
 
 
 class Model(Step):
     _columns = {"target": Option(None, []), "features": MultiSelect([], [])}
+    _sink = True
 
     def get_columns_out(self):
         return ["{}|{}".format(self.columns["target"].value, self.name)]
@@ -17,8 +21,30 @@ class Model(Step):
         self.columns["features"].options = [c for c in columns if c != target]
 
 
+def _fit_group(model, X: np.ndarray, y: np.ndarray) -> np.ndarray:
+    model = deepcopy(model).fit(X, y)
+    return np.append(model.coef_, model.intercept_)
+
+
+def _get_keys(df: pd.DataFrame, by: list) -> pd.Index:
+    if len(by) == 1:
+        return pd.Index(df[by[0]])
+    return pd.MultiIndex.from_frame(df[by])
+
+
 class SkLearnModelWrapper(Model):
-    _params = {"sklearn_model": None}
+    """Fit `sklearn_model` and predict the target from the fitted coefficients.
+
+    With `by` columns set, one model is fitted per group on a joblib pool of
+    `group_n_jobs` workers. The rows are split once in sorted group order, the
+    coefficients are stored as one 2-D array with a row per group and all
+    groups are scored in a single pass. Rows of groups that were not fitted
+    are predicted as NaN. Streaming needs an estimator with `partial_fit` and
+    no `by` columns.
+    """
+
+    _columns = dict(Model._columns, by=MultiSelect([], []))
+    _params = {"sklearn_model": None, "group_n_jobs": 1}
 
     @property
     def name(self):
@@ -28,20 +54,72 @@ class SkLearnModelWrapper(Model):
         params = super(SkLearnModelWrapper, self)._init_params(params)
         return dict(**params["sklearn_model"].get_params(), **params)
 
+    def update_available_columns(self, columns):
+        super(SkLearnModelWrapper, self).update_available_columns(columns)
+        self.columns["by"].options = columns
+
+    def _update_coeffs(self, model, features):
+        self.coeffs["coeffs"] = pd.Series(
+            np.append(model.coef_, model.intercept_), index=features + ["Intercept"]
+        )
+
+    def _fit_groups(self, df: pd.DataFrame, features: list, by: list) -> None:
+        from joblib import Parallel, delayed
+
+        grouper = df[by].groupby(by, sort=True, observed=True)
+        codes = grouper.ngroup().to_numpy()
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(grouper.ngroups + 1))
+        X = df[features].to_numpy(dtype=float)[order]
+        y = df[self.columns["target"].value].to_numpy(dtype=float)[order]
+        model = self.params["sklearn_model"]
+        coeffs = Parallel(n_jobs=self.params["group_n_jobs"])(
+            delayed(_fit_group)(model, X[start:stop], y[start:stop])
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        )
+        keys = grouper.size().index
+        self.coeffs["groups"] = pd.Series(np.arange(len(keys)), index=keys)
+        self.coeffs["coeffs"] = np.array(coeffs, dtype=float).reshape(
+            len(keys), len(features) + 1
+        )
+
     def fit(self, df: pd.DataFrame) -> None:
         model = self.params["sklearn_model"]
         features = self.columns["features"].value
+        by = list(self.columns["by"])
+        if by:
+            return self._fit_groups(df, features, by)
         model.fit(df[features], df[self.columns["target"].value])
-        self.coeffs["coeffs"] = pd.Series(
-            np.append(model.coef_, model.intercept_), index=features + ["Intercept"]
-        )
+        self._update_coeffs(model, features)
+
+    def partial_fit(self, df: pd.DataFrame) -> None:
+        model = self.params["sklearn_model"]
+        # Refitting on each chunk would only keep what the last chunk taught.
+        if not hasattr(model, "partial_fit"):
+            raise ValueError("{} has no partial_fit to stream with.".format(self.name))
+        if list(self.columns["by"]):
+            raise ValueError("Models fitted by group cannot be streamed.")
+        features = self.columns["features"].value
+        model.partial_fit(df[features], df[self.columns["target"].value])
+        self._update_coeffs(model, features)
+
+    def _transform_groups(self, df: pd.DataFrame, features: list, by: list):
+        rows = self.coeffs["groups"].index.get_indexer(_get_keys(df, by))
+        coeffs = self.coeffs["coeffs"][rows]
+        values = (df[features].to_numpy(dtype=float) * coeffs[:, :-1]).sum(axis=1)
+        values += coeffs[:, -1]
+        values[rows < 0] = np.nan
+        return pd.DataFrame({self.get_columns_out()[0]: values}, index=df.index)
 
     def transform(self, df: pd.DataFrame):
         features = self.columns["features"].value
+        by = list(self.columns["by"])
+        if by:
+            return append_columns(df, self._transform_groups(df, features, by))
         df_ = df[features]
         coeffs = self.coeffs["coeffs"]
         df_ = (df_ * coeffs[features]).sum(axis=1).to_frame()
         if "Intercept" in coeffs:
             df_ += coeffs["Intercept"]
         df_.columns = self.get_columns_out()
-        return pd.concat([df, df_], axis=1)
+        return append_columns(df, df_)
@@ -0,0 +1,183 @@
+import logging
+import threading
+from collections import OrderedDict
+from copy import copy, deepcopy
+
+import numpy as np
+import pandas as pd
+
+from pipy.pipeline.frame import ColumnStore, as_frame
+from pipy.pipeline.state import _get_class, _iter_steps
+
+logger = logging.getLogger(__name__)
+
+
+def sample(
+    df: pd.DataFrame, n: int = None, frac: float = None, by=None, seed: int = 0
+) -> pd.DataFrame:
+    """Deterministic sample of about `n` rows, or a `frac` of them, of `df`.
+
+    Rows are ranked by a seeded hash of their index, or of their `by` columns,
+    in which case whole groups are kept so that per-group steps such as moving
+    averages see complete histories. The same rows and groups are picked
+    whatever the order of `df`.
+    """
+    if (n is None) == (frac is None):
+        raise ValueError("Pass exactly one of `n` and `frac`.")
+    size = min(len(df), n if n is not None else int(round(frac * len(df))))
+    if size <= 0:
+        return df.iloc[:0]
+    keys = df.index.to_series() if by is None else df[by]
+    hashes = pd.util.hash_pandas_object(
+        keys, index=False, hash_key="{:016d}".format(seed)
+    ).to_numpy()
+    if by is None:
+        return df.iloc[np.sort(np.argsort(hashes, kind="stable")[:size])]
+    _, groups, counts = np.unique(hashes, return_inverse=True, return_counts=True)
+    n_groups = np.searchsorted(np.cumsum(counts), size) + 1
+    return df.iloc[np.flatnonzero(groups < n_groups)]
+
+
+def _get_key(steps) -> str:
+    from joblib import hash as hashy
+
+    from pipy.pipeline.cache import _freeze
+
+    return hashy(
+        [
+            (
+                _get_class(s),
+                _freeze({k: v for k, v in s.params.items() if k != "steps"}),
+                _freeze(s.columns),
+                getattr(s, "usecols", None),
+            )
+            for s in steps
+        ]
+    )
+
+
+def _get_steps(pipeline) -> list:
+    return [pipeline] + [s for _, s in _iter_steps(pipeline)]
+
+
+def _copy_step(step):
+    # Fitted on the sample without touching the coeffs, or the estimators in the
+    # params, that the full run is fitting at the same time.
+    step = copy(step)
+    step.params = deepcopy(step.params)
+    step.coeffs = deepcopy(type(step).coeffs)
+    return step
+
+
+class Previewer:
+    """Sampled previews of a pipeline, with its full run in the background.
+
+    `preview` runs a copy of the steps, minus those that only write, over a
+    sample of the extracted rows and returns the result straight away. The
+    full run then proceeds on a background thread and replaces `df` once it
+    finishes. Full results and the coeffs that produced them are kept for the
+    last `maxsize` sets of params, so previewing params that already ran
+    restores them instantly. Extracts are assumed to read the same data for
+    the same params. The error of a failed full run is logged and re-raised by
+    `wait`.
+    """
+
+    def __init__(self, pipeline, maxsize: int = 8):
+        self.pipeline = pipeline
+        self.maxsize = maxsize
+        self.df = pd.DataFrame()
+        self.error = None
+        self._results = OrderedDict()
+        self._extracted = (None, None)
+        self._key = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _extract(self, sources):
+        key = _get_key(sources)
+        if self._extracted[0] != key:
+            frame = ColumnStore()
+            for s in sources:
+                frame.append(as_frame(s.transform(ColumnStore())))
+            self._extracted = (key, frame.to_frame())
+        return self._extracted[1]
+
+    def _run_sample(self, n, frac, stratify_by, seed) -> pd.DataFrame:
+        steps = [s for s in self.pipeline.plan() if not s._sink or s.get_columns_out()]
+        sources = self.pipeline._get_sources(steps)
+        df = self._extract(sources) if sources else self.pipeline.df
+        frame = ColumnStore(sample(df, n, frac, stratify_by, seed))
+        for s in steps:
+            if s in sources:
+                continue
+            s = _copy_step(s)
+            s.fit(frame)
+            frame = s.transform(frame)
+            if not isinstance(frame, ColumnStore):
+                frame = ColumnStore(frame)
+        return frame.to_frame()
+
+    def preview(
+        self, n: int = None, frac: float = None, stratify_by=None, seed: int = 0
+    ) -> pd.DataFrame:
+        key = _get_key(_get_steps(self.pipeline))
+        with self._lock:
+            if key in self._results:
+                self._key = key
+                self._results.move_to_end(key)
+                self.df = self._results[key][0]
+                if self._thread is None:
+                    self._restore(key)
+                return self.df
+        df = self._run_sample(n, frac, stratify_by, seed)
+        with self._lock:
+            self._key = key
+            self.df = df
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return df
+
+    def _restore(self, key):
+        df, coeffs = self._results[key]
+        self.pipeline.df = df
+        for s, c in zip(_get_steps(self.pipeline), coeffs):
+            s.coeffs = deepcopy(c)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                key = self._key
+                if key in self._results:
+                    self._restore(key)
+                    self._thread = None
+                    return
+            try:
+                df = self.pipeline.fit_transform(self.pipeline.df)
+            except Exception as e:
+                logger.exception("Full run after a preview failed.")
+                with self._lock:
+                    self.error = e
+                    self._thread = None
+                return
+            steps = _get_steps(self.pipeline)
+            with self._lock:
+                # Params edited during the run may or may not have been used.
+                if _get_key(steps) == key:
+                    self._results[key] = (df, [deepcopy(s.coeffs) for s in steps])
+                    while len(self._results) > self.maxsize:
+                        self._results.popitem(last=False)
+                if self._key == key:
+                    self.df = df
+                    self._thread = None
+                    return
+
+    def wait(self, timeout: float = None):
+        """Block until the full run of the last preview has finished."""
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
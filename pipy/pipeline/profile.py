@@ -0,0 +1,63 @@
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+
+COLUMNS = [
+    "step",
+    "uuid",
+    "stage",
+    "wall_time",
+    "cpu_time",
+    "peak_memory",
+    "rows_in",
+    "rows_out",
+    "bytes_out",
+]
+
+
+@contextmanager
+def measure(step, stage: str, df):
+    """Time a stage of `step` and, while tracemalloc is tracing, its memory.
+
+    `peak_memory` is the most memory allocated during the stage on top of what
+    was allocated when it started, as traced by tracemalloc, e.g. under
+    `python -X tracemalloc`. Stages running at the same time share the peak.
+    """
+    record = {"step": step.name, "uuid": step.uuid, "stage": stage, "rows_in": len(df)}
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+    wall_time, cpu_time = time.perf_counter(), time.thread_time()
+    yield record
+    record["wall_time"] = time.perf_counter() - wall_time
+    record["cpu_time"] = time.thread_time() - cpu_time
+    if tracing:
+        record["peak_memory"] = tracemalloc.get_traced_memory()[1] - start
+
+
+def get_bytes(df, columns) -> int:
+    return sum(int(df[c].memory_usage(index=False)) for c in columns if c in df)
+
+
+class Profiler:
+    def __init__(self, hooks: list = None):
+        self.hooks = list(hooks or [])
+        self.records = []
+
+    def add(self, record: dict):
+        self.records.append(record)
+        for hook in self.hooks:
+            hook(record)
+
+    def clear(self):
+        self.records = []
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.records, columns=COLUMNS)
+
+    def get_step_times(self) -> pd.Series:
+        return self.to_frame().groupby("uuid")["wall_time"].sum()
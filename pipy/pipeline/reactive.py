@@ -0,0 +1,58 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Reactor:
+    """Rerun the parts of a pipeline affected by edits to its steps.
+
+    `notify` marks a step as edited. Once `delay` seconds pass without another
+    edit, the edited steps and everything downstream of them are recomputed on
+    a background thread, so a burst of edits results in a single run. Runs never
+    overlap. The error of a failed run is logged and re-raised by `wait`.
+    """
+
+    def __init__(self, pipeline, delay: float = 0.5):
+        self.pipeline = pipeline
+        self.delay = delay
+        self.error = None
+        self._pending = {}
+        self._timer = None
+        self._lock = threading.Lock()
+        self._running = threading.Lock()
+
+    def notify(self, step):
+        with self._lock:
+            self._pending[step.uuid] = step
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self._run)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _run(self):
+        with self._running:
+            with self._lock:
+                steps, self._pending = list(self._pending.values()), {}
+                if self._timer is threading.current_thread():
+                    self._timer = None
+            if not steps:
+                return
+            try:
+                self.pipeline.recompute(self.pipeline.invalidate(steps))
+            except Exception as e:
+                logger.exception("Recomputing after an edit failed.")
+                self.error = e
+
+    def wait(self, timeout: float = None):
+        """Block until pending edits have been recomputed."""
+        with self._lock:
+            timer = self._timer
+        if timer is not None:
+            timer.join(timeout)
+        with self._running:
+            pass
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
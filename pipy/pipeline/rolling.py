@@ -0,0 +1,141 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+
+
+def get_groups(keys: pd.DataFrame):
+    """Sort order, segment starts and missing-key mask for rows grouped by `keys`.
+
+    The order is None when rows of each group are already contiguous.
+    """
+    codes = keys.groupby(list(keys.columns), sort=False).ngroup().to_numpy()
+    order = None
+    if (np.diff(codes) < 0).any():
+        order = np.argsort(codes, kind="stable")
+        codes = codes[order]
+    n = len(codes)
+    change = np.ones(n, dtype=bool)
+    change[1:] = codes[1:] != codes[:-1]
+    starts = np.maximum.accumulate(np.where(change, np.arange(n), 0))
+    return order, starts, codes < 0
+
+
+def _cumulate(values: np.ndarray):
+    n, k = values.shape
+    # Shift each column to reduce cancellation in the cumulative sums.
+    valid = ~np.isnan(values)
+    shift = np.zeros(k)
+    totals = np.where(valid, values, 0).sum(axis=0)
+    np.divide(totals, valid.sum(axis=0), out=shift, where=valid.any(axis=0))
+    sums = np.zeros((n + 1, k))
+    np.cumsum(np.where(valid, values - shift, 0), axis=0, out=sums[1:])
+    counts = np.zeros((n + 1, k), dtype=np.int64)
+    np.cumsum(valid, axis=0, out=counts[1:])
+    return shift, sums, counts
+
+
+def _fill(shift, sums, counts, periods, starts, min_periods, out):
+    n, k = len(sums) - 1, len(shift)
+    stop = np.arange(1, n + 1)
+    lower = 0 if starts is None else starts
+    for j, p in enumerate(periods):
+        minimum = max(p if min_periods is None else min_periods, 1)
+        start = np.maximum(stop - p, lower)
+        window_counts = counts[stop] - counts[start]
+        result = out[:, j * k : (j + 1) * k]
+        np.divide(sums[stop] - sums[start], np.maximum(window_counts, 1), out=result)
+        result += shift
+        result[window_counts < minimum] = np.nan
+
+
+@contextmanager
+def _share(arrays):
+    blocks = []
+    try:
+        for a in arrays:
+            block = SharedMemory(create=True, size=max(a.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(a.shape, a.dtype, buffer=block.buf)[...] = a
+        yield [(b.name, a.shape, a.dtype.str) for b, a in zip(blocks, arrays)]
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def _fill_shared(specs, periods, offset, min_periods):
+    blocks = [SharedMemory(name=name) for name, _, _ in specs]
+    try:
+        arrays = [
+            np.ndarray(shape, dtype, buffer=b.buf)
+            for b, (_, shape, dtype) in zip(blocks, specs)
+        ]
+        shift, sums, counts, starts, out = arrays
+        k = len(shift)
+        out = out[:, offset * k : (offset + len(periods)) * k]
+        _fill(shift, sums, counts, periods, starts, min_periods, out)
+        del arrays, shift, sums, counts, starts, out
+    finally:
+        for block in blocks:
+            block.close()
+
+
+def _rolling_mean_parallel(values, periods, starts, min_periods, n_jobs, out):
+    n, k = values.shape
+    shift, sums, counts = _cumulate(values)
+    if starts is None:
+        starts = np.zeros(n, dtype=np.int64)
+    n_jobs = min(n_jobs if n_jobs > 0 else os.cpu_count(), len(periods))
+    offsets = np.linspace(0, len(periods), n_jobs + 1).astype(int)
+    shape = (n, k * len(periods))
+    # The workers write straight into a shared block, copied out once at the end.
+    block = SharedMemory(create=True, size=max(8 * shape[0] * shape[1], 1))
+    try:
+        shared = np.ndarray(shape, np.float64, buffer=block.buf)
+        with _share([shift, sums, counts, starts]) as specs:
+            specs.append((block.name, shape, shared.dtype.str))
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                futures = [
+                    executor.submit(
+                        _fill_shared, specs, periods[lo:hi], lo, min_periods
+                    )
+                    for lo, hi in zip(offsets[:-1], offsets[1:])
+                ]
+                for future in futures:
+                    future.result()
+        if out is None:
+            out = shared.copy()
+        else:
+            out[...] = shared
+    finally:
+        # The block can only be closed once no array points into it.
+        shared = None
+        block.close()
+        block.unlink()
+    return out
+
+
+def rolling_mean(
+    values: np.ndarray, periods, starts=None, min_periods=None, out=None, n_jobs=1
+):
+    """Rolling means of each column of `values` for every window in `periods`.
+
+    All windows are taken from a single cumulative sum. Windows do not reach
+    back beyond `starts`, the first row of each row's segment. The result has
+    one column per (period, column) pair, period-major. With `n_jobs` other than
+    1 the periods are split over a process pool that reads the cumulative sums
+    from, and writes its results to, shared memory.
+    """
+    periods = list(periods)
+    if n_jobs != 1 and len(periods) > 1:
+        return _rolling_mean_parallel(values, periods, starts, min_periods, n_jobs, out)
+    n, k = values.shape
+    if out is None:
+        out = np.empty((n, k * len(periods)))
+    shift, sums, counts = _cumulate(values)
+    _fill(shift, sums, counts, periods, starts, min_periods, out)
+    return out
@@ -0,0 +1,87 @@
+import importlib
+import json
+import os
+
+from pipy.parameters import PandasParam
+from pipy.pipeline._base import Step
+
+
+def _get_path(obj):
+    return "{}.{}".format(type(obj).__module__, type(obj).__name__)
+
+
+def _import(path):
+    module, _, name = path.rpartition(".")
+    for prefix in ("", "pipy.pipeline."):
+        try:
+            return getattr(importlib.import_module(prefix + module), name)
+        except (ImportError, AttributeError, ValueError):
+            continue
+    raise ImportError("Cannot import '{}'.".format(path))
+
+
+def _to_value(value):
+    if isinstance(value, Step):
+        return to_spec(value)
+    if isinstance(value, PandasParam):
+        return _to_value(value.value)
+    if isinstance(value, dict):
+        return {k: _to_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_value(v) for v in value]
+    if hasattr(value, "get_params"):
+        params = value.get_params(deep=False)
+        return {"class": _get_path(value), "params": _to_value(params)}
+    return value
+
+
+def to_spec(step: Step) -> dict:
+    spec = {"class": _get_path(step)}
+    params = {k: v for k, v in step.params.items() if k in type(step)._params}
+    if params:
+        spec["params"] = _to_value(params)
+    if step.columns:
+        spec["columns"] = _to_value(step.columns)
+    return spec
+
+
+def _from_value(value):
+    if isinstance(value, dict):
+        if "class" in value:
+            return from_spec(value)
+        return {k: _from_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_from_value(v) for v in value]
+    return value
+
+
+def from_spec(spec: dict):
+    if "class" not in spec:
+        spec = {"class": "pipy.pipeline.Pipeline", "params": spec}
+    cls = _import(spec["class"])
+    params = _from_value(spec.get("params", {}))
+    if isinstance(cls, type) and issubclass(cls, Step):
+        return cls(params=params, columns=spec.get("columns"))
+    return cls(**params)
+
+
+def load_spec(path: str) -> Step:
+    with open(path) as f:
+        if os.path.splitext(path)[1] in (".yaml", ".yml"):
+            import yaml
+
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+    return from_spec(spec)
+
+
+def dump_spec(step: Step, path: str) -> None:
+    spec = to_spec(step)
+    with open(path, "w") as f:
+        if os.path.splitext(path)[1] in (".yaml", ".yml"):
+            import yaml
+
+            yaml.safe_dump(spec, f, sort_keys=False)
+        else:
+            json.dump(spec, f, indent=2)
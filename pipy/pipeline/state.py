@@ -0,0 +1,127 @@
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+def _iter_steps(pipeline, prefix=""):
+    for n, step in enumerate(pipeline.params["steps"]):
+        key = "{}{}".format(prefix, n)
+        yield key, step
+        if "steps" in step.params:
+            yield from _iter_steps(step, key + ".")
+
+
+def _get_class(step):
+    return "{}.{}".format(type(step).__module__, type(step).__name__)
+
+
+def _to_array(values) -> np.ndarray:
+    values = np.asarray(values)
+    if values.dtype.hasobject and pd.api.types.infer_dtype(values) == "string":
+        # Fixed-width strings can be memory-mapped, unlike pickled objects.
+        values = values.astype(str)
+    return values
+
+
+def _save_array(path, name, values) -> dict:
+    values = _to_array(values)
+    np.save(os.path.join(path, name), values)
+    return {"file": name, "pickled": values.dtype.hasobject}
+
+
+def _load_array(path, entry, mmap):
+    name = os.path.join(path, entry["file"])
+    if entry["pickled"]:
+        return np.load(name, allow_pickle=True)
+    return np.load(name, mmap_mode="r" if mmap else None)
+
+
+def _save_value(path, name, value) -> dict:
+    if isinstance(value, pd.Series):
+        return {
+            "type": "series",
+            "dtype": str(value.dtype),
+            "values": _save_array(path, name + ".npy", value.to_numpy()),
+            "index": _save_array(path, name + ".index.npy", value.index),
+        }
+    if isinstance(value, np.ndarray):
+        return {"type": "array", "values": _save_array(path, name + ".npy", value)}
+    return {"type": "json", "value": value}
+
+
+def _load_value(path, entry, mmap):
+    if entry["type"] == "json":
+        return entry["value"]
+    values = _load_array(path, entry["values"], mmap)
+    if entry["type"] == "array":
+        return values
+    index = _load_array(path, entry["index"], False)
+    index = pd.Index(index, dtype=object if index.dtype.kind == "U" else None)
+    s = pd.Series(values, index=index, copy=False)
+    return s if str(s.dtype) == entry["dtype"] else s.astype(entry["dtype"])
+
+
+def _is_state(path) -> bool:
+    try:
+        with open(os.path.join(path, "manifest.json")) as f:
+            return "steps" in json.load(f)
+    except (OSError, ValueError):
+        return False
+
+
+def save_state(pipeline, path: str) -> None:
+    """Write the coeffs of `pipeline` and its steps to the directory `path`.
+
+    Series and arrays are saved as .npy files next to a manifest.json that
+    holds everything else. The directory is replaced as a whole, and only if it
+    holds a state saved before; any other existing path raises a ValueError.
+    """
+    if os.path.lexists(path) and not _is_state(path):
+        raise ValueError("'{}' exists and does not hold a saved state.".format(path))
+    parent = os.path.dirname(os.path.abspath(path))
+    tmp = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+    manifest = {"steps": {}}
+    for key, step in [("", pipeline)] + list(_iter_steps(pipeline)):
+        manifest["steps"][key] = {
+            "class": _get_class(step),
+            "coeffs": {
+                k: _save_value(tmp, "{}-{}".format(key or "pipeline", n), v)
+                for n, (k, v) in enumerate(step.coeffs.items())
+            },
+        }
+    with open(os.path.join(tmp, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    old = None
+    if os.path.lexists(path):
+        old = tempfile.mkdtemp(dir=parent, prefix=".old-")
+        os.replace(path, old)
+    os.replace(tmp, path)
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def load_state(pipeline, path: str, mmap: bool = True) -> None:
+    """Restore coeffs written by `save_state` into a pipeline with the same steps.
+
+    Numeric arrays are memory-mapped read-only unless `mmap` is False.
+    """
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    steps = [("", pipeline)] + list(_iter_steps(pipeline))
+    if [k for k, _ in steps] != list(manifest["steps"]):
+        raise ValueError("State in '{}' is for a different pipeline.".format(path))
+    for key, step in steps:
+        entry = manifest["steps"][key]
+        if entry["class"] != _get_class(step):
+            raise ValueError(
+                "State for step {} is for {}, not {}.".format(
+                    key, entry["class"], _get_class(step)
+                )
+            )
+        step.coeffs = {
+            k: _load_value(path, v, mmap) for k, v in entry["coeffs"].items()
+        }
@@ -1,7 +1,10 @@
+import numpy as np
 import pandas as pd
 
 from pipy.parameters import Iterable, MultiSelect, Option
 from pipy.pipeline import Step
+from pipy.pipeline.frame import append_columns
+from pipy.pipeline.rolling import get_groups, rolling_mean
 from pipy.pipeline.utils import combine_series
 
 
@@ -17,34 +20,122 @@ class DayOfWeek(Transform):
         s = s.astype("datetime64[ns]")
         s = s.dt.dayofweek
         s.name = self.get_columns_out()[0]
-        return pd.concat([df, s], axis=1)
+        return append_columns(df, s)
+
+    def get_context(self, df: pd.DataFrame):
+        return df.iloc[:0]
 
 
 class Normalise(Transform):
     def fit(self, df: pd.DataFrame) -> None:
-        means = df[self.columns["in"]].mean()
+        df_ = df[self.columns["in"]]
+        for key, s in (("sums", df_.sum()), ("counts", df_.count())):
+            self.coeffs[key] = combine_series(self.coeffs.get(key, pd.Series), s)
+        means = df_.mean()
         self.coeffs["means"] = combine_series(
             self.coeffs.get("means", pd.Series), means
         )
 
+    def partial_fit(self, df: pd.DataFrame) -> None:
+        df_ = df[self.columns["in"]]
+        sums, counts = df_.sum(), df_.count()
+        if "counts" in self.coeffs:
+            sums = sums.add(self.coeffs["sums"], fill_value=0)
+            counts = counts.add(self.coeffs["counts"], fill_value=0)
+        self.coeffs["sums"], self.coeffs["counts"] = sums, counts
+        self.coeffs["means"] = sums / counts
+
+    def stream(self, chunks, chunksize: int = None):
+        # Each stream scales by the rows it has seen, not those of earlier runs.
+        for key in ("sums", "counts"):
+            self.coeffs.pop(key, None)
+        yield from super(Normalise, self).stream(chunks, chunksize)
+
     def transform(self, df: pd.DataFrame) -> pd.DataFrame:
-        df_ = df[self.columns["in"]] / self.coeffs["means"]
+        df_ = df[self.columns["in"]]
+        df_ = df_ / self.coeffs["means"][df_.columns]
         df_.columns = self.get_columns_out()
-        return pd.concat([df, df_], axis=1)
+        return append_columns(df, df_)
 
 
 class MovingAverage(Transform):
-    _params = {"periods": Iterable([], int), "pandas_kwargs": {}}
+    """Rolling means of the `in` columns over each of `periods`, within `by` groups.
 
-    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+    `n_jobs` only applies to the cumulative-sum path. Any `pandas_kwargs` other
+    than `min_periods` fall back to pandas rolling windows, which run serially.
+    """
+
+    _columns = {"in": MultiSelect([], []), "by": MultiSelect([], [])}
+    _params = {"periods": Iterable([], int), "pandas_kwargs": {}, "n_jobs": 1}
+
+    def _transform_pandas(self, df: pd.DataFrame) -> pd.DataFrame:
+        by = list(self.columns["by"])
+        df_ = df[self.columns["in"]]
+        if by:
+            keys = df[by]
+            df_ = df_.groupby([keys[c] for c in by], sort=False)
         dfs = []
         for p in self.params["periods"]:
-            dfs.append(
-                df[self.columns["in"]]
-                .rolling(window=p, **self.params["pandas_kwargs"])
-                .mean()
-            )
-
+            df_p = df_.rolling(window=p, **self.params["pandas_kwargs"]).mean()
+            if by:
+                df_p = df_p.reset_index(level=list(range(len(by))), drop=True)
+            dfs.append(df_p.reindex(df.index))
         df_ = pd.concat(dfs, axis=1)
         df_.columns = self.get_columns_out()
-        return pd.concat([df, df_], axis=1)
+        return df_
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        kwargs = self.params["pandas_kwargs"]
+        if set(kwargs).difference({"min_periods"}):
+            return append_columns(df, self._transform_pandas(df))
+
+        values = df[self.columns["in"]].to_numpy(dtype=float)
+        order, starts, missing = None, None, None
+        by = list(self.columns["by"])
+        if by:
+            order, starts, missing = get_groups(df[by])
+            if order is not None:
+                values = values[order]
+        out = rolling_mean(
+            values,
+            list(self.params["periods"]),
+            starts,
+            kwargs.get("min_periods"),
+            n_jobs=self.params["n_jobs"],
+        )
+        if by:
+            out[missing] = np.nan
+            if order is not None:
+                out_ = np.empty_like(out)
+                out_[order] = out
+                out = out_
+        df_ = pd.DataFrame(out, index=df.index, columns=self.get_columns_out())
+        return append_columns(df, df_)
+
+    def get_context(self, df: pd.DataFrame):
+        if self.params["pandas_kwargs"].get("center"):
+            return None
+        lookback = max(self.params["periods"], default=1) - 1
+        by = list(self.columns["by"])
+        if by:
+            return df.groupby(by, sort=False).tail(lookback)
+        return df.iloc[len(df) - lookback :]
+
+    def stream(self, chunks, chunksize: int = None):
+        by = list(self.columns["by"])
+        columns = list(self.columns["in"]) + by
+        if self.get_context(pd.DataFrame(columns=columns)) is None:
+            raise ValueError(
+                "{} cannot stream with pandas_kwargs {}.".format(
+                    self.name, self.params["pandas_kwargs"]
+                )
+            )
+        tail = None
+        for df in chunks:
+            df_ = df[columns]
+            if tail is not None:
+                df_ = pd.concat([tail, df_])
+            columns_out = self.get_columns_out()
+            df_out = self.transform(df_)[columns_out].iloc[len(df_) - len(df) :]
+            tail = self.get_context(df_)
+            yield append_columns(df, df_out)
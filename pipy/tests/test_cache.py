@@ -0,0 +1,60 @@
+import pandas as pd
+from mock import patch
+
+from pipy.pipeline.cache import StepCache
+from pipy.pipeline import Pipeline
+from pipy.pipeline.transform import DayOfWeek, MovingAverage
+from pipy.tests import testing
+
+
+def test_step_cache(tmp_path):
+    cache = StepCache(str(tmp_path))
+    df = testing.get_dummy_dataset()
+    cache.put("key", df)
+    pd.testing.assert_frame_equal(cache.get("key"), df)
+    assert cache.get("missing") is None
+
+
+def test_step_cache_eviction(tmp_path):
+    cache = StepCache(str(tmp_path), max_bytes=3000)
+    df = testing.get_dummy_dataset()[["added_notional"]]
+    for key in "abcdef":
+        cache.put(key, df)
+    cache.get("a")
+    cache.put("g", df)
+    keys = {e.name for e in tmp_path.iterdir()}
+    assert "a" in keys and "g" in keys
+    assert sum(f.stat().st_size for f in tmp_path.rglob("*.*")) <= 3000
+
+
+def test_pipeline_cache(tmp_path):
+    pipe = testing.get_skippy_pipeline()
+    pipe.params["cache"] = StepCache(str(tmp_path))
+    df_expected = pipe.run()
+
+    pipe = testing.get_skippy_pipeline()
+    pipe.params["cache"] = StepCache(str(tmp_path))
+    with patch.object(MovingAverage, "transform", side_effect=AssertionError):
+        pd.testing.assert_frame_equal(pipe.run(), df_expected)
+    std = pipe.params["steps"][-1]
+    assert "means" in std.coeffs
+    columns = std.get_columns_in() + std.get_columns_out()
+    df = std.transform(df_expected[std.get_columns_in()])
+    pd.testing.assert_frame_equal(df[columns], df_expected[columns])
+
+
+def test_pipeline_cache_index(tmp_path):
+    def get_pipeline(shift):
+        extract = testing.DummyData()
+        extract.extract = lambda df=None: testing.get_dummy_dataset().set_axis(
+            pd.RangeIndex(shift, shift + 10)
+        )
+        weekday = DayOfWeek(columns={"in": "date"})
+        return Pipeline(
+            {"steps": [extract, weekday], "cache": StepCache(str(tmp_path))}
+        )
+
+    expected = get_pipeline(0).run()
+    df = get_pipeline(100).run()
+    assert df.index[0] == 100
+    assert df["date|DayOfWeek"].tolist() == expected["date|DayOfWeek"].tolist()
@@ -0,0 +1,81 @@
+import networkx as nx
+
+from pipy.pipeline.dag import DagIndex
+from pipy.pipeline.transform import MovingAverage, Normalise
+
+
+class Edges:
+    def __init__(self, edges):
+        self.uuid = str(id(self))
+        self.params = {"edges": edges}
+        self.calls = 0
+
+    def get_columns_in(self):
+        return [i for i, _ in self.params["edges"]]
+
+    def get_columns_out(self):
+        self.calls += 1
+        return [o for _, o in self.params["edges"]]
+
+    def get_dag(self):
+        return nx.DiGraph(self.params["edges"])
+
+
+def test_dag_index_diamonds():
+    # Ten stacked diamonds have 2**10 paths from top to bottom.
+    steps = []
+    for n in range(10):
+        top, bottom = str(n), str(n + 1)
+        steps.append(Edges([(top, top + "a"), (top, top + "b")]))
+        steps.append(Edges([(top + "a", bottom), (top + "b", bottom)]))
+    index = DagIndex()
+    assert index.refresh(steps)
+    descendants = index.get_descendants(["0"])
+    assert len(descendants) == len(set(descendants)) == 30
+    assert descendants[-1] == "10"
+    assert set(index.get_ancestors(["1"])) == {"0", "0a", "0b"}
+
+
+def test_dag_index_deep_chain():
+    steps = [Edges([(str(n), str(n + 1))]) for n in range(5000)]
+    index = DagIndex()
+    index.refresh(steps)
+    assert index.get_descendants(["0"]) == [str(n) for n in range(1, 5001)]
+    assert index.get_descendants(["4999"]) == ["5000"]
+
+
+def test_dag_index_refresh():
+    steps = [Edges([("a", "b")]), Edges([("b", "c")])]
+    index = DagIndex()
+    index.refresh(steps)
+    assert not index.refresh(steps)
+    assert [s.calls for s in steps] == [1, 1]
+    steps[1].params["edges"] = [("b", "d")]
+    assert index.refresh(steps)
+    assert index.get_descendants(["a"]) == ["b", "d"]
+    assert index.refresh(steps[:1])
+    assert index.get_descendants(["a"]) == ["b"]
+
+
+def test_dag_index_linked_columns():
+    mav = MovingAverage(columns={"in": ["a"]}, params={"periods": [2]})
+    std = Normalise(columns={"in": mav.get_columns_out})
+    index = DagIndex()
+    index.refresh([mav, std])
+    mav.params["periods"].update([3])
+    # The inputs of `std` follow the outputs of `mav`, so both are refreshed.
+    assert index.refresh([mav, std])
+    assert index.get_descendants(["a"]) == [
+        "a|MovingAverage(periods=3)",
+        "a|MovingAverage(periods=3)|Normalise",
+    ]
+
+
+def test_dag_by_columns():
+    mav = MovingAverage(
+        columns={"in": ["a", "b"], "by": ["id"]}, params={"periods": [2]}
+    )
+    index = DagIndex()
+    index.refresh([mav])
+    assert index.get_descendants(["id"]) == mav.get_columns_out()
+    assert index.get_descendants(["a"]) == ["a|MovingAverage(periods=2)"]
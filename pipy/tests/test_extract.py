@@ -0,0 +1,140 @@
+import decimal
+import sqlite3
+
+import pandas as pd
+import pytest
+from mock import Mock
+
+from pipy.pipeline import Pipeline, extract, load
+from pipy.pipeline.transform import Normalise
+from pipy.tests import testing
+
+
+def get_sqlite_extract(path, **params):
+    connect = Mock(side_effect=sqlite3.connect)
+
+    class SQLite(extract.SQL):
+        # Connections are bound to the thread that made them.
+        threadsafety = 1
+
+    SQLite.connect = staticmethod(connect)
+    params = dict({"dsn": str(path), "query": "SELECT * FROM dummy;"}, **params)
+    return SQLite(params=params), connect
+
+
+def test_sql(tmp_path):
+    df = testing.get_dummy_dataset().drop(columns="date")
+    with sqlite3.connect(tmp_path / "db.sqlite") as cxn:
+        df.to_sql("dummy", cxn, index=False)
+
+    sql, connect = get_sqlite_extract(tmp_path / "db.sqlite", batchsize=3)
+    assert sql.get_columns_out() == df.columns.tolist()
+    pd.testing.assert_frame_equal(sql.extract(), df)
+    pd.testing.assert_frame_equal(pd.concat(sql.extract_chunks(chunksize=4)), df)
+    sql.get_columns_out()
+    assert connect.call_count == 1
+    extract.close_pools()
+
+
+def test_sql_rerun(tmp_path):
+    df = testing.get_dummy_dataset().drop(columns="date")
+    with sqlite3.connect(tmp_path / "db.sqlite") as cxn:
+        df.to_sql("dummy", cxn, index=False)
+
+    sql, _ = get_sqlite_extract(tmp_path / "db.sqlite")
+    std = Normalise(columns={"in": ["added_notional"]})
+    pipe = Pipeline({"steps": [sql, std]})
+    try:
+        assert len(pipe.run()) == 10
+        with sqlite3.connect(tmp_path / "db.sqlite") as cxn:
+            df.to_sql("dummy", cxn, index=False, if_exists="append")
+        assert len(pipe.run()) == 20
+    finally:
+        extract.close_pools()
+
+
+def test_sql_decimal(tmp_path):
+    sqlite3.register_converter("NUMERIC_", lambda b: decimal.Decimal(b.decode()))
+    with sqlite3.connect(tmp_path / "db.sqlite") as cxn:
+        cxn.execute("CREATE TABLE dummy (id INTEGER, price NUMERIC_, name TEXT);")
+        cxn.executemany(
+            "INSERT INTO dummy VALUES (?, ?, ?);",
+            [(1, "1.5", "a"), (2, None, "b"), (3, "2.25", None)],
+        )
+
+    sql, connect = get_sqlite_extract(tmp_path / "db.sqlite", batchsize=2)
+    connect.side_effect = lambda dsn: sqlite3.connect(
+        dsn, detect_types=sqlite3.PARSE_DECLTYPES
+    )
+    # Decimals come out as floats, as pd.read_sql does with coerce_float.
+    expected = pd.DataFrame(
+        {"id": [1, 2, 3], "price": [1.5, None, 2.25], "name": ["a", "b", None]}
+    )
+    pd.testing.assert_frame_equal(sql.extract(), expected)
+    pd.testing.assert_frame_equal(pd.concat(sql.extract_chunks(chunksize=2)), expected)
+    extract.close_pools()
+
+
+def test_sql_stop_early(tmp_path):
+    df = testing.get_dummy_dataset().drop(columns="date")
+    with sqlite3.connect(tmp_path / "db.sqlite") as cxn:
+        df.to_sql("dummy", cxn, index=False)
+
+    sql, connect = get_sqlite_extract(tmp_path / "db.sqlite")
+    connections = []
+
+    def record(dsn):
+        connections.append(sqlite3.connect(dsn))
+        return connections[-1]
+
+    connect.side_effect = record
+    chunks = sql.extract_chunks(chunksize=4)
+    next(chunks)
+    chunks.close()
+    # The connection is closed rather than left in a transaction.
+    with pytest.raises(sqlite3.ProgrammingError):
+        connections[0].cursor()
+    pd.testing.assert_frame_equal(sql.extract(), df)
+    assert len(connections) == 2
+    extract.close_pools()
+
+
+def test_sql_concurrent(tmp_path):
+    df = testing.get_dummy_dataset().drop(columns="date")
+    with sqlite3.connect(tmp_path / "db.sqlite") as cxn:
+        df.to_sql("dummy", cxn, index=False)
+
+    sql, _ = get_sqlite_extract(
+        tmp_path / "db.sqlite", query="SELECT added_notional FROM dummy"
+    )
+    dates = testing.DummyData()
+    dates.get_columns_out = lambda: ["date"]
+    dates.extract = lambda df=None: testing.get_dummy_dataset()[["date"]]
+    pipe = Pipeline({"steps": [sql, dates]})
+    try:
+        for _ in range(2):
+            result = pipe.run()
+    finally:
+        extract.close_pools()
+    expected = testing.get_dummy_dataset()[["added_notional", "date"]]
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize("fmt", ["Feather", "Parquet"])
+@pytest.mark.parametrize("compression", [None, "zstd"])
+def test_arrow(tmp_path, fmt, compression):
+    df = testing.get_dummy_dataset()
+    path = str(tmp_path / "dummy.{}".format(fmt.lower()))
+    getattr(load, fmt)(params={"path": path, "compression": compression}).load(df)
+
+    step = getattr(extract, fmt)(params={"path": path})
+    assert step.get_columns_out() == df.columns.tolist()
+    pd.testing.assert_frame_equal(step.extract(), df)
+    pd.testing.assert_frame_equal(pd.concat(step.extract_chunks(chunksize=4)), df)
+    step.usecols = ["added_notional"]
+    pd.testing.assert_frame_equal(step.extract(), df[["added_notional"]])
+
+    chunks = list(getattr(load, fmt)(params={"path": path}).stream([df[:4], df[4:]]))
+    pd.testing.assert_frame_equal(pd.concat(chunks), df)
+    step.usecols = None
+    pd.testing.assert_frame_equal(step.extract(), df.reset_index(drop=True))
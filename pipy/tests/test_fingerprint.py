@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipy.pipeline.fingerprint import fingerprint, fingerprint_columns
+from pipy.tests import testing
+
+
+@pytest.mark.parametrize(
+    "s",
+    [
+        pd.Series(np.arange(10.0)),
+        pd.Series(["a", "b", None] * 3),
+        pd.Series(pd.Categorical(["x", "y", "y"])),
+        pd.Series(pd.date_range("2019-01-01", periods=5, tz="UTC")),
+        pd.Series([1, "a", 2.5]),
+    ],
+)
+def test_fingerprint(s):
+    assert fingerprint(s) == fingerprint(s.copy())
+    assert fingerprint(s) != fingerprint(s.iloc[::-1].reset_index(drop=True))
+    assert fingerprint(s) != fingerprint(s.set_axis(s.index + 100))
+    assert fingerprint(s) != fingerprint(s.set_axis(s.index.astype(float)))
+
+
+def test_fingerprint_dtypes():
+    s = pd.Series(np.arange(5))
+    assert fingerprint(s) != fingerprint(s.astype(float))
+    categories = pd.Series(pd.Categorical(["x", "y"]))
+    recoded = pd.Series(pd.Categorical(["x", "y"], categories=["y", "x"]))
+    assert fingerprint(categories) != fingerprint(recoded)
+
+
+def test_fingerprint_columns():
+    df = testing.get_panel_dataset(10, 10, n_columns=4)
+    hashes = fingerprint_columns(df, n_jobs=2)
+    assert hashes.index.tolist() == df.columns.tolist()
+    assert hashes.tolist() == [fingerprint(df[c]) for c in df.columns]
+    assert fingerprint_columns(df, n_jobs=1).equals(hashes)
@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+from pipy.pipeline.frame import ColumnStore, append_columns
+from pipy.tests import testing
+
+
+def test_column_store():
+    df = testing.get_dummy_dataset()
+    frame = ColumnStore(df)
+    s = (df["added_notional"] * 2).rename("double")
+    assert append_columns(frame, s) is frame
+    pd.testing.assert_series_equal(frame["double"], s)
+    pd.testing.assert_frame_equal(
+        frame[["date", "double"]], df[["date"]].assign(double=s)
+    )
+    pd.testing.assert_frame_equal(frame.to_frame(), pd.concat([df, s], axis=1))
+    assert frame.to_frame() is frame.to_frame()
+
+
+def test_column_store_index():
+    df = testing.get_dummy_dataset()
+    frame = ColumnStore(df)
+    s = df["added_notional"].rename("reversed").iloc[::-1]
+    pd.testing.assert_series_equal(frame.append(s)["reversed"], s.sort_index())
+    with pytest.raises(ValueError):
+        frame.append(pd.concat([s, s], ignore_index=True))
+    with pytest.raises(ValueError):
+        frame.append(s.iloc[:5])
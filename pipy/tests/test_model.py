@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression, SGDRegressor
+
+from pipy import pipeline
+from pipy.tests import testing
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_grouped_model(tmp_path, n_jobs):
+    df = testing.get_panel_dataset(n_firms=20, n_dates=30)
+    df = df.sample(frac=1, random_state=0)
+    df.loc[df.index[:5], "firm_id"] = np.nan
+    ols = pipeline.model.SkLearnModelWrapper(
+        columns={
+            "target": "added_notional",
+            "features": ["removed_notional"],
+            "by": ["firm_id"],
+        },
+        params={"sklearn_model": LinearRegression(), "group_n_jobs": n_jobs},
+    )
+    pipe = pipeline.Pipeline({"steps": [ols]})
+    pipe.df = df
+    result = pipe.run()[ols.get_columns_out()[0]]
+
+    assert ols.coeffs["coeffs"].shape == (20, 2)
+    for firm_id, df_ in df.groupby("firm_id"):
+        model = LinearRegression().fit(df_[["removed_notional"]], df_["added_notional"])
+        coeffs = ols.coeffs["coeffs"][ols.coeffs["groups"][firm_id]]
+        np.testing.assert_allclose(coeffs, [model.coef_[0], model.intercept_])
+        np.testing.assert_allclose(
+            result[df_.index], model.predict(df_[["removed_notional"]])
+        )
+    assert result[df["firm_id"].isna()].isna().all()
+
+    pipe.save_state(str(tmp_path / "state"))
+    ols.coeffs = {}
+    pipe.load_state(str(tmp_path / "state"))
+    pd.testing.assert_series_equal(pipe.transform(df)[result.name], result)
+
+
+def test_partial_fit_model():
+    df = testing.get_dummy_dataset()
+    columns = {"target": "added_notional", "features": ["removed_notional"]}
+    sgd = pipeline.model.SkLearnModelWrapper(
+        columns=columns, params={"sklearn_model": SGDRegressor(random_state=0)}
+    )
+    for n in range(0, 10, 5):
+        sgd.partial_fit(df.iloc[n : n + 5])
+    assert sgd.params["sklearn_model"].t_ == 11
+
+    ols = pipeline.model.SkLearnModelWrapper(
+        columns=columns, params={"sklearn_model": LinearRegression()}
+    )
+    with pytest.raises(ValueError):
+        ols.partial_fit(df)
+    ols.columns["by"].update(["firm_id"])
+    ols.params["sklearn_model"] = SGDRegressor()
+    with pytest.raises(ValueError):
+        ols.partial_fit(df)
@@ -1,9 +1,19 @@
+import subprocess
+import sys
+import threading
+import tracemalloc
+
+import numpy as np
 import pandas as pd
+import pytest
 from mock import patch
+from sklearn.linear_model import SGDRegressor
 from testfixtures import compare
 
+from pipy import pipeline
 from pipy.tests import testing
 from pipy.pipeline.load import CSV
+from pipy.pipeline.preview import sample
 
 
 @patch.object(CSV, "load", lambda _, df: df)
@@ -64,3 +74,294 @@ def test_skippy(caplog):
     #     caplog.messages,
     #     expected=['Changes detected - rerunning pipeline for 2 columns only.']
     # )
+
+
+def test_skippy_append(caplog):
+    def get_steps():
+        mav = pipeline.transform.MovingAverage(
+            columns={"in": ["added_notional"], "by": ["firm_id"]},
+            params={"periods": [2, 5]},
+        )
+        return [
+            mav,
+            pipeline.transform.DayOfWeek(columns={"in": "date"}),
+            pipeline.transform.Normalise(columns={"in": mav.get_columns_out()}),
+        ]
+
+    extract = testing.PanelData(params={"n_firms": 3, "n_dates": 20})
+    pipe = pipeline.Skippy({"steps": [extract] + get_steps(), "append": True})
+    pipe.run()
+    new = testing.get_panel_dataset(3, 2, seed=1)
+    new.index += len(pipe.df)
+    pipe.df = pd.concat([pipe.df, new])
+    caplog.clear()
+    result = pipe.run()
+    compare(
+        caplog.messages,
+        expected=["Rows appended - rerunning pipeline for 6 new rows only."],
+    )
+
+    expected = pipeline.Pipeline({"steps": get_steps()})
+    expected.df = result[extract.get_columns_out()]
+    pd.testing.assert_frame_equal(result, expected.run())
+
+
+def test_pipeline_step_dag():
+    pipe = testing.get_skippy_pipeline()
+    dag = pipe.get_step_dag()
+    compare(sorted(dag.edges()), expected=[(0, 1), (1, 2)])
+
+
+@patch.object(CSV, "load", lambda _, df: df)
+def test_pipeline_parallel():
+    df_expected = testing.get_etl_pipeline().run()
+    pipe = testing.get_etl_pipeline()
+    pipe.params["n_jobs"] = 2
+    pd.testing.assert_frame_equal(pipe.run(), df_expected)
+
+    # A rerun over an extract that gained rows keeps all of them.
+    grown = pd.concat([testing.get_dummy_dataset()] * 2, ignore_index=True)
+    with patch.object(testing.DummyData, "extract", return_value=grown):
+        assert len(pipe.run()) == 20
+
+
+@pytest.mark.parametrize("fmt", ["CSV", "Feather", "Parquet"])
+@pytest.mark.parametrize("background", [False, True])
+def test_pipeline_stream(tmp_path, fmt, background):
+    testing.get_dummy_dataset().to_csv(tmp_path / "in.csv", index=False)
+    read = {"CSV": pd.read_csv, "Feather": pd.read_feather}.get(fmt, pd.read_parquet)
+
+    def get_pipeline(path):
+        extract = pipeline.extract.CSV(params={"path": str(tmp_path / "in.csv")})
+        mav = pipeline.transform.MovingAverage(
+            columns={"in": ["added_notional", "removed_notional"]},
+            params={"periods": [2, 3]},
+        )
+        params = {"path": str(path), "background": background}
+        if fmt == "CSV":
+            params["pandas_kwargs"] = {"index": False}
+        load = getattr(pipeline.load, fmt)(params=params)
+        return pipeline.Pipeline({"steps": [extract, mav, load]})
+
+    get_pipeline(tmp_path / "batch.out").run()
+    get_pipeline(tmp_path / "stream.out").run(chunksize=3)
+    pd.testing.assert_frame_equal(
+        read(tmp_path / "stream.out"), read(tmp_path / "batch.out")
+    )
+
+
+def test_pipeline_stream_twice(tmp_path):
+    testing.get_dummy_dataset().to_csv(tmp_path / "in.csv", index=False)
+    extract = pipeline.extract.CSV(params={"path": str(tmp_path / "in.csv")})
+    std = pipeline.transform.Normalise(columns={"in": ["added_notional"]})
+    load = pipeline.load.CSV(
+        params={"path": str(tmp_path / "out.csv"), "pandas_kwargs": {"index": False}}
+    )
+    pipe = pipeline.Pipeline({"steps": [extract, std, load]})
+    pipe.run()
+    outputs = []
+    for _ in range(2):
+        pipe.run(chunksize=3)
+        outputs.append(pd.read_csv(tmp_path / "out.csv"))
+    pd.testing.assert_frame_equal(outputs[0], outputs[1])
+    assert outputs[0]["added_notional|Normalise"][:3].tolist() == [0.0, 1.0, 2.0]
+
+
+def test_pipeline_background_error(tmp_path):
+    pipe = testing.get_etl_pipeline()
+    load = pipe.params["steps"][-1]
+    load.params.update(path=str(tmp_path / "missing" / "out.csv"), background=True)
+    with pytest.raises(OSError):
+        pipe.run()
+    # Streaming needs a model that can be fitted chunk by chunk.
+    pipe.params["steps"][2].params["sklearn_model"] = SGDRegressor()
+    with pytest.raises(OSError):
+        pipe.run(chunksize=3)
+    assert load._background is None
+
+
+def test_pipeline_concurrent_extract():
+    data = {"df": testing.get_dummy_dataset()}
+    barrier = threading.Barrier(2, timeout=5)
+
+    class Columns(pipeline.extract.Extract):
+        _params = {"columns": []}
+
+        def extract(self, df_=None):
+            # Deadlocks unless both extracts run at once.
+            barrier.wait()
+            return data["df"][self.params["columns"]]
+
+        def get_columns_out(self):
+            return self.params["columns"]
+
+    pipe = pipeline.Pipeline(
+        {
+            "steps": [
+                Columns(params={"columns": ["added_notional", "date"]}),
+                pipeline.transform.DayOfWeek(columns={"in": "date"}),
+                Columns(params={"columns": ["firm_id"]}),
+            ]
+        }
+    )
+    result = pipe.run()
+    assert result.columns.tolist() == [
+        "added_notional",
+        "date",
+        "firm_id",
+        "date|DayOfWeek",
+    ]
+    columns = ["added_notional", "date", "firm_id"]
+    pd.testing.assert_frame_equal(result[columns], data["df"][columns])
+
+    # Sources that gained rows are not cut down to the rows of the last run.
+    data["df"] = pd.concat([data["df"]] * 2, ignore_index=True)
+    pd.testing.assert_frame_equal(pipe.run()[columns], data["df"][columns])
+
+
+def test_pipeline_reactive():
+    def get_steps(periods):
+        return [
+            testing.DummyData(),
+            pipeline.transform.DayOfWeek(columns={"in": "date"}),
+            pipeline.transform.MovingAverage(
+                columns={"in": ["added_notional"]}, params={"periods": periods}
+            ),
+        ]
+
+    pipe = pipeline.Pipeline({"steps": get_steps([2]), "reactive": True})
+    pipe.reactive_delay = 0.05
+    pipe.run()
+    extract, weekday, mav = pipe.params["steps"]
+    mav.params["periods"].update([3])
+    with patch.object(
+        pipeline.transform.DayOfWeek, "transform", side_effect=AssertionError
+    ):
+        for _ in range(3):
+            pipe.notify(mav)
+        pipe.reactor.wait()
+    expected = pipeline.Pipeline({"steps": get_steps([3])}).run()
+    pd.testing.assert_frame_equal(pipe.df, expected)
+    assert pipe.profile["step"].tolist() == ["MovingAverage"] * 2
+
+
+def test_pipeline_preview():
+    def get_pipeline():
+        return pipeline.Pipeline(
+            {
+                "steps": [
+                    testing.PanelData({"n_firms": 50, "n_dates": 10}),
+                    pipeline.transform.MovingAverage(
+                        columns={"in": ["added_notional"], "by": ["firm_id"]},
+                        params={"periods": [3]},
+                    ),
+                ]
+            }
+        )
+
+    pipe = get_pipeline()
+    extract, mav = pipe.params["steps"]
+    preview = pipe.preview(frac=0.1, stratify_by="firm_id")
+    assert len(preview) == 50 and preview["firm_id"].nunique() == 5
+    expected = get_pipeline().run()
+    shuffled = expected.sample(frac=1, random_state=0)
+    pd.testing.assert_index_equal(
+        sample(shuffled, n=50, by="firm_id").sort_index().index, preview.index
+    )
+    pd.testing.assert_frame_equal(preview, expected.loc[preview.index])
+    pipe.previewer.wait()
+    pd.testing.assert_frame_equal(pipe.df, expected)
+    assert pipe.previewer.df is pipe.df
+
+    mav.params["periods"].update([2])
+    pipe.preview(frac=0.1)
+    pipe.previewer.wait()
+    full = pipe.df
+    mav.params["periods"].update([3])
+    with patch.object(testing.PanelData, "extract", side_effect=AssertionError):
+        pd.testing.assert_frame_equal(pipe.preview(frac=0.1), expected)
+    pipe.previewer.wait()
+    pd.testing.assert_frame_equal(pipe.df, expected)
+    assert full.columns[-1] == "added_notional|MovingAverage(periods=2)"
+
+
+def test_partial_fit():
+    df = testing.get_dummy_dataset()
+    full = pipeline.transform.Normalise(columns={"in": ["added_notional"]})
+    full.fit(df)
+    mean = full.coeffs["means"]["added_notional"]
+    std = pipeline.transform.Normalise(columns={"in": ["added_notional"]})
+    pipe = pipeline.Pipeline({"steps": [std]})
+    for n in range(0, 10, 3):
+        pipe.partial_fit(df.iloc[n : n + 3])
+    assert std.coeffs["means"]["added_notional"] == mean
+
+
+@patch.object(CSV, "load", lambda _, df: df)
+def test_pipeline_prune():
+    pipe = testing.get_etl_pipeline()
+    extract, weekday, ols, load = pipe.params["steps"]
+    mav = pipeline.transform.MovingAverage(
+        columns={"in": ["removed_notional"]}, params={"periods": [2]}
+    )
+    load.columns["in"].update(ols.get_columns_out())
+    pipe = pipeline.Pipeline(
+        {"steps": [extract, mav, weekday, ols, load], "prune": True}
+    )
+    compare(pipe.plan(), expected=[extract, weekday, ols, load])
+    compare(extract.usecols, expected=["added_notional", "date"])
+    compare(
+        pipe.run().columns.tolist(),
+        expected=[
+            "added_notional",
+            "date",
+            "date|DayOfWeek",
+            "added_notional|LinearRegression",
+        ],
+    )
+
+
+@patch.object(CSV, "load", lambda _, df: df)
+def test_pipeline_profile():
+    pipe = testing.get_etl_pipeline()
+    records = []
+    pipe.profiler.hooks.append(records.append)
+    pipe.run()
+    profile = pipe.profile
+    compare(profile.shape, expected=(8, 9))
+    compare(len(records), expected=8)
+    weekday = profile[(profile.step == "DayOfWeek") & (profile.stage == "transform")]
+    compare(
+        weekday[["rows_in", "rows_out", "bytes_out"]].values.tolist(),
+        expected=[[10, 10, 80]],
+    )
+    assert (profile.wall_time >= 0).all()
+    assert profile.peak_memory.isna().all()
+    pipe.display_dag()
+
+
+def test_pipeline_profile_memory():
+    class Allocate(pipeline.transform.Transform):
+        def transform(self, df):
+            np.ones(2**20)
+            return df
+
+    pipe = pipeline.Pipeline({"steps": [testing.DummyData(), Allocate()]})
+    tracemalloc.start()
+    try:
+        pipe.run()
+    finally:
+        tracemalloc.stop()
+    peaks = pipe.profile.set_index(["step", "stage"])["peak_memory"]
+    assert peaks["Allocate", "transform"] >= 8 * 2**20
+    assert peaks["Allocate", "fit"] < 2**20
+
+
+def test_pipeline_headless():
+    code = (
+        "import sys; from pipy.pipeline import Pipeline, transform;"
+        "Pipeline({'steps': [transform.DayOfWeek(columns={'in': 'date'})]});"
+        "print(sorted({'IPython', 'graphviz', 'ipywidgets', 'sklearn'} & set(sys.modules)))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    compare(out.stdout.strip(), expected="[]")
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipy.pipeline.rolling import rolling_mean
+from pipy.pipeline.transform import MovingAverage
+from pipy.tests import testing
+
+
+@pytest.mark.parametrize("by", [[], ["firm_id"]])
+@pytest.mark.parametrize("pandas_kwargs", [{}, {"min_periods": 1}, {"center": True}])
+def test_moving_average(by, pandas_kwargs):
+    df = testing.get_dummy_dataset().sample(frac=1, random_state=0)
+    df.loc[df.index[3], "added_notional"] = np.nan
+    mav = MovingAverage(
+        columns={"in": ["added_notional", "removed_notional"], "by": by},
+        params={"periods": [2, 3], "pandas_kwargs": pandas_kwargs},
+    )
+    df_ = df[mav.columns["in"]]
+    if by:
+        df_ = df_.groupby(df["firm_id"])
+    expected = pd.concat(
+        [df_.rolling(p, **pandas_kwargs).mean() for p in (2, 3)], axis=1
+    )
+    if by:
+        expected = expected.droplevel(0).reindex(df.index)
+    expected.columns = mav.get_columns_out()
+    pd.testing.assert_frame_equal(mav.transform(df)[expected.columns], expected)
+
+
+def test_moving_average_parallel():
+    df = testing.get_dummy_dataset()
+    kwargs = {
+        "columns": {"in": ["added_notional", "removed_notional"], "by": ["firm_id"]},
+        "params": {"periods": [1, 2, 3, 4, 5]},
+    }
+    expected = MovingAverage(**kwargs).transform(df)
+    mav = MovingAverage(**kwargs)
+    mav.params["n_jobs"] = 2
+    pd.testing.assert_frame_equal(mav.transform(df), expected, check_exact=True)
+
+
+def test_moving_average_stream_center():
+    df = testing.get_dummy_dataset()
+    mav = MovingAverage(
+        columns={"in": ["added_notional"]},
+        params={"periods": [3], "pandas_kwargs": {"center": True}},
+    )
+    # Centred windows need rows from the next chunk, which a stream has not read.
+    with pytest.raises(ValueError):
+        next(mav.stream([df.iloc[:5], df.iloc[5:]]))
+
+
+def test_rolling_mean_parallel_out():
+    values = np.arange(40.0).reshape(20, 2)
+    expected = rolling_mean(values, [2, 3, 4])
+    out = np.empty_like(expected)
+    assert rolling_mean(values, [2, 3, 4], out=out, n_jobs=2) is out
+    np.testing.assert_array_equal(out, expected)
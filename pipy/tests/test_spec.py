@@ -0,0 +1,38 @@
+import json
+
+import pandas as pd
+from testfixtures import compare
+
+from pipy import cli
+from pipy.pipeline.spec import dump_spec, load_spec, to_spec
+from pipy.tests import testing
+
+
+def test_spec_roundtrip(tmp_path):
+    pipe = testing.get_etl_pipeline()
+    pipe.params["steps"][-1].params["path"] = str(tmp_path / "out.csv")
+    dump_spec(pipe, str(tmp_path / "spec.json"))
+    spec = json.loads((tmp_path / "spec.json").read_text())
+    compare(
+        spec["params"]["steps"][2]["params"]["sklearn_model"]["class"],
+        expected="sklearn.linear_model._base.LinearRegression",
+    )
+    pipe_ = load_spec(str(tmp_path / "spec.json"))
+    compare(to_spec(pipe_), expected=spec)
+    pd.testing.assert_frame_equal(pipe_.run(), pipe.run())
+
+
+def test_cli_run(tmp_path, capsys):
+    paths = []
+    for n in range(3):
+        pipe = testing.get_etl_pipeline()
+        pipe.params["steps"][-1].params["path"] = str(tmp_path / "{}.csv".format(n))
+        paths.append(str(tmp_path / "{}.json".format(n)))
+        dump_spec(pipe, paths[-1])
+    (tmp_path / "bad.json").write_text('{"class": "transform.Missing"}')
+    code = cli.main(["run", "--jobs", "2"] + paths + [str(tmp_path / "bad.json")])
+    compare(code, expected=1)
+    out = capsys.readouterr().out
+    compare(out.count("OK "), expected=3)
+    compare(out.count("FAILED "), expected=1)
+    assert (tmp_path / "2.csv").exists()
@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+
+from pipy import pipeline
+from pipy.tests import testing
+
+
+def test_state_roundtrip(tmp_path):
+    pipe = testing.get_skippy_pipeline()
+    df_expected = pipe.run()
+    pipe.save_state(str(tmp_path / "state"))
+
+    warm = testing.get_skippy_pipeline()
+    warm.load_state(str(tmp_path / "state"))
+    mav, std = warm.params["steps"][1:]
+    means = std.coeffs["means"]
+    assert not means.to_numpy().flags.writeable
+    pd.testing.assert_series_equal(warm.coeffs["hashes"], pipe.coeffs["hashes"])
+    warm.df = pipe.df
+    pd.testing.assert_frame_equal(warm.transform(pipe.df), df_expected)
+
+
+def test_state_mismatch(tmp_path):
+    pipe = testing.get_skippy_pipeline()
+    pipe.run()
+    pipe.save_state(str(tmp_path / "state"))
+    with pytest.raises(ValueError):
+        testing.get_etl_pipeline().load_state(str(tmp_path / "state"))
+
+
+def test_state_per_instance():
+    mav = pipeline.transform.MovingAverage(params={"periods": [2]})
+    assert pipeline.transform.MovingAverage().params["periods"].value == []
+    assert mav.params["periods"].value == [2]
+    std = pipeline.transform.Normalise(columns={"in": ["added_notional"]})
+    std.fit(testing.get_dummy_dataset())
+    assert pipeline.transform.Normalise().coeffs == {}
+
+
+def test_state_overwrite(tmp_path):
+    pipe = testing.get_skippy_pipeline()
+    pipe.run()
+    (tmp_path / "notes.txt").write_text("keep")
+    with pytest.raises(ValueError):
+        pipe.save_state(str(tmp_path))
+    assert (tmp_path / "notes.txt").exists()
+    pipe.save_state(str(tmp_path / "state"))
+    pipe.save_state(str(tmp_path / "state"))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["notes.txt", "state"]
@@ -0,0 +1,22 @@
+import pandas as pd
+from testfixtures import compare
+
+from pipy.tests import testing
+
+
+def test_panel_dataset():
+    df = testing.get_panel_dataset(n_firms=3, n_dates=4, n_columns=3)
+    chunks = list(testing.iter_panel_dataset(3, 4, 3, chunksize=2))
+    pd.testing.assert_frame_equal(pd.concat(chunks), df)
+    compare(
+        df.columns.tolist(),
+        expected=[
+            "added_notional",
+            "removed_notional",
+            "notional_2",
+            "firm_id",
+            "date",
+        ],
+    )
+    compare(df.shape, expected=(12, 5))
+    pd.testing.assert_frame_equal(df.sort_values(["firm_id", "date"]), df)
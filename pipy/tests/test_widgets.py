@@ -0,0 +1,91 @@
+import time
+
+import ipywidgets as ipy
+import pytest
+
+from pipy.interactive import InteractiveDict, WidgetRegistry
+from pipy.parameters import Iterable, MultiSelect, Option
+from pipy.pipeline._display import render_step
+from pipy.tests import testing
+from pipy.widgets import FilterAndSelect
+
+
+def test_filter_and_select():
+    options = ["column_{}".format(n) for n in range(20000)]
+    widget = FilterAndSelect(
+        options=options, value=["column_3", "column_1"], delay=0, page_size=100
+    )
+    unselected_filter = widget.children[1].children[1]
+    assert widget.selection == ("column_1", "column_3")
+    assert len(widget._lists[False].options) == 100
+    assert widget._labels[False].value == "1-100 of 19998"
+
+    unselected_filter.value = "COLUMN_19"
+    assert widget._labels[False].value == "1-100 of 1111"
+    widget._turn(False, 20)
+    assert widget._labels[False].value == "1101-1111 of 1111"
+
+    start = time.perf_counter()
+    widget._move(True, widget._matches[False])
+    assert time.perf_counter() - start < 1
+    assert len(widget.selection) == 1113
+    assert list(widget)[:3] == ["column_1", "column_3", "column_19"]
+    assert widget._labels[False].value == "0-0 of 0"
+
+    widget._lists[True].value = ("column_1",)
+    widget._move(False, widget._lists[True].value)
+    assert "column_1" not in widget.selection
+
+
+def test_filter_and_select_debounce():
+    widget = FilterAndSelect(options=["a", "ab", "abc"], delay=0.05)
+    unselected_filter = widget.children[1].children[1]
+    for query in ("a", "ab", "abc"):
+        unselected_filter.value = query
+    assert widget._lists[False].options == ("a", "ab", "abc")
+    time.sleep(0.2)
+    assert widget._lists[False].options == ("abc",)
+
+
+def test_interactive_dict_on_change():
+    changes = []
+    columns = {
+        "in": MultiSelect([], []).update(["a"], ["a", "b"]),
+        "by": Option("", []).update("a", ["a", "b"]),
+        "periods": Iterable([], int).update([2, 3]),
+    }
+    widget = InteractiveDict(columns, on_change=changes.append).render()
+    select, dropdown, text = [box.children[1] for box in widget.children]
+    assert text.value == "2, 3"
+    select._move(True, ["b"])
+    dropdown.value = "b"
+    text.value = "2, 5"
+    assert changes == ["in", "by", "periods"]
+    assert columns["periods"].value == [2, 5]
+    with pytest.raises(ValueError):
+        text.value = "2, x"
+    assert columns["periods"].value == [2, 5] and len(changes) == 3
+    assert isinstance(columns["in"], MultiSelect) and columns["in"].value == ["a", "b"]
+    assert isinstance(columns["by"], Option) and columns["by"].value == "b"
+
+
+def test_widget_registry_closes_evicted():
+    registry = WidgetRegistry(maxsize=2)
+    widgets = [ipy.Label(str(n)) for n in range(3)]
+    for n, widget in enumerate(widgets):
+        registry[n] = widget
+    assert len(registry) == 2 and 0 not in registry
+    assert widgets[0].comm is None and widgets[1].comm is not None
+    registry.pop(1)
+    assert widgets[1].comm is None
+
+
+def test_render_step_reuses_widgets():
+    from ipywidgets.widgets.widget import _instances
+
+    step = testing.get_skippy_pipeline().params["steps"][-1]
+    render_step(step)
+    count = len(_instances)
+    for _ in range(3):
+        render_step(step)
+    assert len(_instances) == count
@@ -15,6 +15,28 @@ def get_dummy_dataset():
     return df.reset_index(drop=True)
 
 
+def iter_panel_dataset(n_firms, n_dates, n_columns=2, chunksize=None, seed=0):
+    chunksize = chunksize or n_firms
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2019-01-01", periods=n_dates, freq="D")
+    columns = ["added_notional", "removed_notional"]
+    columns += ["notional_{}".format(n) for n in range(2, n_columns)]
+    firm_ids = pd.Categorical(["F{:06d}".format(n) for n in range(n_firms)])
+    for start in range(0, n_firms, chunksize):
+        firms = np.arange(start, min(start + chunksize, n_firms))
+        n_rows = len(firms) * n_dates
+        values = rng.integers(0, 1000, size=(n_rows, n_columns)).astype(float)
+        df = pd.DataFrame(values, columns=columns[:n_columns])
+        df["firm_id"] = firm_ids[np.repeat(firms, n_dates)]
+        df["date"] = np.tile(dates.values, len(firms))
+        df.index = pd.RangeIndex(start * n_dates, start * n_dates + n_rows)
+        yield df
+
+
+def get_panel_dataset(n_firms, n_dates, n_columns=2, seed=0):
+    return pd.concat(iter_panel_dataset(n_firms, n_dates, n_columns, seed=seed))
+
+
 class DummyData(pipeline.extract.Extract):
     def extract(self, df: pd.DataFrame = pd.DataFrame()):
         return get_dummy_dataset()
@@ -23,6 +45,16 @@ class DummyData(pipeline.extract.Extract):
         return ["added_notional", "removed_notional", "firm_id", "date"]
 
 
+class PanelData(pipeline.extract.Extract):
+    _params = {"n_firms": 2, "n_dates": 5, "n_columns": 2}
+
+    def extract(self, df: pd.DataFrame = pd.DataFrame()):
+        return get_panel_dataset(**self.params)
+
+    def get_columns_out(self):
+        return next(iter_panel_dataset(**dict(self.params, n_firms=1))).columns.tolist()
+
+
 def get_etl_pipeline():
     extract = DummyData()
     weekday = pipeline.transform.DayOfWeek(columns={"in": "date"})
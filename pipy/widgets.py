@@ -1,109 +1,129 @@
-from operator import itemgetter
+import threading
 
 import ipywidgets as ipy
+from traitlets import Tuple
 
 
 class FilterAndSelect(ipy.VBox):
-    def __init__(self, **kwargs):
+    """Pick a subset of `options` by moving them between two filterable lists.
+
+    Membership is a set and filters match against a precomputed lowercase index,
+    so updates are linear in the number of options. Filtering waits for `delay`
+    seconds of quiet typing, and each list only shows one page of `page_size`
+    matches. The chosen options, in their original order, are in `selection`.
+    """
+
+    selection = Tuple()
+
+    def __init__(self, delay: float = 0.2, page_size: int = 500, **kwargs):
         """Public constructor"""
-        self.options = kwargs.pop("options", [])
-        selected = kwargs.pop("value", [])
-        unselected = [o for o in self.options if o not in selected]
-        selected = ipy.SelectMultiple(
-            options=selected, layout=ipy.Layout(height="240px")
-        )
-        unselected = ipy.SelectMultiple(
-            options=unselected, layout=ipy.Layout(height="240px")
-        )
+        self.options = list(kwargs.pop("options", None) or [])
+        value = list(kwargs.pop("value", None) or [])
+        known = set(self.options)
+        self.options += [o for o in value if o not in known]
+        self._index = [str(o).lower() for o in self.options]
+        self._chosen = set(value)
+        self.delay = delay
+        self.page_size = page_size
+        self._queries = {False: "", True: ""}
+        self._pages = {False: 0, True: 0}
+        self._matches = {False: [], True: []}
+        self._timers = {}
+        self._lists = {
+            side: ipy.SelectMultiple(layout=ipy.Layout(height="240px"))
+            for side in (False, True)
+        }
+        self._labels = {side: ipy.Label() for side in (False, True)}
         super(FilterAndSelect, self).__init__(**kwargs)
 
-        select = ipy.Button(description=">", layout=ipy.Layout(width="41px"))
-        unselect = ipy.Button(description="<", layout=ipy.Layout(width="41px"))
-        select_filtered = ipy.Button(description=">>", layout=ipy.Layout(width="41px"))
-        unselect_filtered = ipy.Button(
-            description="<<", layout=ipy.Layout(width="41px")
-        )
+        def button(description, callback):
+            widget = ipy.Button(
+                description=description, layout=ipy.Layout(width="41px")
+            )
+            widget.on_click(lambda _: callback())
+            return widget
+
+        unselected, selected = self._lists[False], self._lists[True]
         selectors = ipy.HBox(
             [
                 ipy.Box(layout=ipy.Layout(width="45px")),
                 unselected,
-                ipy.VBox([select, select_filtered, unselect, unselect_filtered]),
+                ipy.VBox(
+                    [
+                        button(">", lambda: self._move(True, unselected.value)),
+                        button(">>", lambda: self._move(True, self._matches[False])),
+                        button("<", lambda: self._move(False, selected.value)),
+                        button("<<", lambda: self._move(False, self._matches[True])),
+                    ]
+                ),
                 selected,
             ]
         )
-        unselected_filter = ipy.Text(continuous_update=True)
-        selected_filter = ipy.Text(continuous_update=True)
-        filters = ipy.HBox(
-            [
-                ipy.HTML(
-                    '<i class="fa fa-filter center label-icon" style="min-width=32px">'
-                ),
-                unselected_filter,
+        filters = []
+        pagers = [ipy.Box(layout=ipy.Layout(width="45px"))]
+        for side in (False, True):
+            text = ipy.Text(continuous_update=True)
+            text.observe(lambda change, side=side: self._filter(side, change), "value")
+            filters += [
                 ipy.HTML(
                     '<i class="fa fa-filter center label-icon" style="min-width=32px">'
                 ),
-                selected_filter,
+                text,
             ]
-        )
-
-        def filter_unselected(change):
-            unselected.options = [
-                o
-                for o in self.options
-                if o not in selected.options and change["new"] in o
-            ]
-
-        def filter_selected(change):
-            selected.options = [
-                o
-                for o in self.options
-                if o not in unselected.options and change["new"] in o
+            pagers += [
+                button("‹", lambda side=side: self._turn(side, -1)),
+                self._labels[side],
+                button("›", lambda side=side: self._turn(side, 1)),
             ]
+        self.children = (selectors, ipy.HBox(filters), ipy.HBox(pagers))
+        self.selected = selected
+        self._move(True, [])
 
-        def add_selected(_):
-            options_to_add = itemgetter(*unselected.index)(unselected.options)
-            selected.options = [
-                o for o in self.options if o in selected.options or o in options_to_add
-            ]
-            unselected.options = [
-                o for o in unselected.options if o not in options_to_add
-            ]
+    def _refresh(self, side: bool):
+        query = self._queries[side]
+        self._matches[side] = [
+            o
+            for o, key in zip(self.options, self._index)
+            if (o in self._chosen) is side and query in key
+        ]
+        self._show(side)
 
-        def add_filtered(_):
-            selected.options = [
-                o
-                for o in self.options
-                if o in selected.options or o in unselected.options
-            ]
-            unselected.options = []
+    def _show(self, side: bool):
+        matches = self._matches[side]
+        last = max(len(matches) - 1, 0) // self.page_size
+        page = self._pages[side] = min(max(self._pages[side], 0), last)
+        start = page * self.page_size
+        stop = min(start + self.page_size, len(matches))
+        self._lists[side].options = matches[start:stop]
+        self._labels[side].value = "{}-{} of {}".format(
+            min(start + 1, stop), stop, len(matches)
+        )
 
-        def remove_selected(_):
-            options_to_remove = itemgetter(*selected.index)(selected.options)
-            unselected.options = [
-                o
-                for o in self.options
-                if o in unselected.options or o in options_to_remove
-            ]
-            selected.options = [
-                o for o in selected.options if o not in options_to_remove
-            ]
+    def _filter(self, side: bool, change):
+        self._queries[side] = change["new"].lower()
+        self._pages[side] = 0
+        timer = self._timers.pop(side, None)
+        if timer is not None:
+            timer.cancel()
+        if self.delay <= 0:
+            self._refresh(side)
+            return
+        timer = self._timers[side] = threading.Timer(self.delay, self._refresh, [side])
+        timer.start()
 
-        def remove_filtered(_):
-            unselected.options = [
-                o
-                for o in self.options
-                if o in unselected.options or o in selected.options
-            ]
-            selected.options = []
+    def _turn(self, side: bool, step: int):
+        self._pages[side] += step
+        self._show(side)
 
-        select.on_click(add_selected)
-        select_filtered.on_click(add_filtered)
-        selected_filter.observe(filter_selected, names="value")
-        unselect.on_click(remove_selected)
-        unselect_filtered.on_click(remove_filtered)
-        unselected_filter.observe(filter_unselected, names="value")
-        self.children = (selectors, filters)
-        self.selected = selected
+    def _move(self, side: bool, options):
+        options = set(options)
+        if side:
+            self._chosen.update(options)
+        else:
+            self._chosen.difference_update(options)
+        self._refresh(False)
+        self._refresh(True)
+        self.selection = tuple(o for o in self.options if o in self._chosen)
 
     def __iter__(self):
-        yield from self.selected.options
+        yield from self.selection
@@ -1,6 +1,6 @@
 #!/usr/bin/env python
 
-from distutils.core import setup
+from setuptools import find_packages, setup
 
 setup(
     name="pipy",
@@ -8,6 +8,7 @@ setup(
     description="Package for interactive transactional ETL pipelines in Jupyter Lab",
     author="Ronald Smits",
     author_email="rhsmits@me.com",
-    packages=["pipy"],
+    packages=find_packages(),
     install_requires=["graphviz", "testfixtures"],
+    entry_points={"console_scripts": ["pipy=pipy.cli:main"]},
 )